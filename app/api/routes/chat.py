@@ -1,20 +1,86 @@
+import asyncio
+import json
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from app.schemas.chat_schema import ChatInput
 from app.services.chatbot_langgraph import flow
-from app.utils.chat_memory import create_or_get_thread, store_message
+from app.services.profiler import annotate
+from app.services.token_usage import format_turn_report, start_turn
+from app.utils.turn_context import TurnContext
 
 router = APIRouter()
 
 @router.post("/chat")
 async def chat_endpoint(data: ChatInput):
-    # Ensure thread exists
-    thread_id = create_or_get_thread(data.user_id, data.thread_id)
-    state = {"user_message": data.message, "thread_id": thread_id}
-    out = flow.invoke(state)
+    # One read: thread history + dialog state for every node of this turn.
+    # pymongo is blocking, so Mongo round trips run off the event loop.
+    context = await asyncio.to_thread(TurnContext.load, data.user_id, data.thread_id)
+    thread_id = context.thread_id
+    state = {"user_message": data.message, "thread_id": thread_id, "context": context}
+    start_turn()
+    out = await flow.ainvoke(state)
+    _log_tokens(thread_id)
+    annotate(thread_id=thread_id, intent=out.get("intent"))
 
-    # Save chat to MongoDB
-    store_message(thread_id, data.message, out["result"])
+    # One write: dialog state changes + the new message (creates the thread if new)
+    context.record_message(data.message, out["result"])
+    await asyncio.to_thread(context.flush)
 
     return {"thread_id": thread_id, "response": out["result"]}
 
-chat_router = router
\ No newline at end of file
+
+def _log_tokens(thread_id: str):
+    report = format_turn_report()
+    if report:
+        print(f"[tokens] thread {thread_id}: {report}")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(data: ChatInput):
+    """
+    Same turn as /chat, streamed as Server-Sent Events:
+    ``start`` (thread_id), ``token`` (text chunks as the LLM writes them),
+    then ``done`` with the final response, which replaces the streamed text.
+    """
+    context = await asyncio.to_thread(TurnContext.load, data.user_id, data.thread_id)
+    thread_id = context.thread_id
+    state = {"user_message": data.message, "thread_id": thread_id, "context": context}
+
+    async def events():
+        yield _sse("start", {"thread_id": thread_id})
+        start_turn()
+        final, streamed = None, False
+        try:
+            async for mode, chunk in flow.astream(state, stream_mode=["custom", "values"]):
+                if mode == "custom":
+                    streamed = True
+                    yield _sse("token", {"text": chunk["token"]})
+                else:
+                    final = chunk
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        result = final["result"]
+        _log_tokens(thread_id)
+        annotate(thread_id=thread_id, intent=final.get("intent"))
+        if not streamed:
+            # Cached or templated answers arrive in one piece
+            yield _sse("token", {"text": result})
+
+        # Persist only after the full response has been generated
+        context.record_message(data.message, result)
+        await asyncio.to_thread(context.flush)
+        yield _sse("done", {"thread_id": thread_id, "response": result})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+chat_router = router
@@ -0,0 +1,42 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, Response
+from app.services import metrics, readiness
+from app.services.intent_classifier import fast_path_stats
+from app.services.llm import gateway
+from app.services.token_usage import cache_hit_rate, usage_totals
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def healthz():
+    # Process is up and serving; says nothing about dependencies
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    ready = readiness.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "components": readiness.status()},
+    )
+
+@router.get("/llm/stats")
+async def llm_stats():
+    # Gateway queue depth, in-flight calls, retries and circuit state per model,
+    # how many turns the intent fast path kept away from the LLM, and token
+    # usage per label with the share of prompt tokens served from the cache
+    return {
+        **gateway.stats(),
+        "intent_fast_path": fast_path_stats(),
+        "tokens": {"prompt_cache_hit_rate": cache_hit_rate(), "by_label": usage_totals()},
+    }
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    # Prometheus scrape target; 404 when prometheus_client is not installed
+    if not metrics.METRICS_ENABLED:
+        return Response(status_code=404, content="metrics disabled")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+health_router = router
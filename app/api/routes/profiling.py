@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from app.services.profiler import profiles
+
+router = APIRouter()
+
+@router.get("/debug/profiles")
+async def list_profiles():
+    # Slowest first: duration, reason (sampled/slow), thread_id and intent
+    return profiles.list()
+
+@router.get("/debug/profiles/{profile_id}")
+async def dump_profile(profile_id: int, format: str = "text"):
+    rendered = profiles.render(profile_id, html=(format == "html"))
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return HTMLResponse(rendered) if format == "html" else PlainTextResponse(rendered)
+
+profiling_router = router
@@ -1,24 +1,68 @@
 import os
+import httpx
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from app.services.cassette import wrap_client
+from app.services.metrics import mongo_listeners
 
 load_dotenv()
 
-# OpenAI
+# OpenAI (async so LLM calls never block the event loop). One keep-alive pool
+# shared by every call; retries and timeouts are handled by app.services.llm.
 API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=API_KEY)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "64"))
 
-# MongoDB
+_pool_limits = httpx.Limits(
+    max_connections=LLM_POOL_SIZE,
+    max_keepalive_connections=LLM_POOL_SIZE,
+    keepalive_expiry=60,
+)
+_timeout = httpx.Timeout(LLM_TIMEOUT, connect=5.0)
+
+client = AsyncOpenAI(
+    api_key=API_KEY,
+    max_retries=0,
+    timeout=_timeout,
+    http_client=httpx.AsyncClient(limits=_pool_limits, timeout=_timeout),
+)
+
+# Blocking client for ingestion threads; the SDK does its own jittered retries
+sync_client = OpenAI(
+    api_key=API_KEY,
+    max_retries=LLM_MAX_RETRIES,
+    timeout=_timeout,
+    http_client=httpx.Client(limits=_pool_limits, timeout=_timeout),
+)
+
+# LLM_CASSETTE_MODE=record|replay serves benchmark runs from a cassette file
+client = wrap_client(client)
+sync_client = wrap_client(sync_client, sync=True)
+
+# MongoDB. "mongomock://" runs an in-process stand-in (pip install mongomock)
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-mongo = MongoClient(MONGO_URI)
+if MONGO_URI.startswith("mongomock://"):
+    import mongomock
+
+    mongo = mongomock.MongoClient()
+else:
+    mongo = MongoClient(MONGO_URI, event_listeners=mongo_listeners())
 db = mongo["BussTicketBD"]
 
 bus_collection = db["busses"]
 chat_collection = db["chat_memory"]
+chat_bucket_collection = db["chat_buckets"]
+booking_collection = db["bookings"]
+trip_inventory_collection = db["trip_inventory"]
 
 __all__ = [
     "client",
+    "sync_client",
     "bus_collection",
     "chat_collection",
+    "chat_bucket_collection",
+    "booking_collection",
+    "trip_inventory_collection",
 ]
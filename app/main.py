@@ -1,14 +1,52 @@
+import asyncio
 from fastapi import FastAPI
 from app.api.routes.chat import chat_router
+from app.api.routes.health import health_router
+from app.api.routes.profiling import profiling_router
 from app.services.buss_data_loader import startup_event
-from app.services.load_to_pinecone import upload_embeddings_if_missing
+from app.services.intent_classifier import warm_up_model
+from app.services.load_to_pinecone import sync_embeddings
+from app.services.profiler import PROFILING_ENABLED, ProfilerMiddleware
+from app.services.readiness import warm_up
+from app.services.route_catalog import get_catalog
+from app.utils.bookings import ensure_booking_indexes
+from app.utils.chat_memory import ensure_indexes
+from app.utils.transcript_writer import WRITE_BEHIND_ENABLED, transcript_writer
 
 app = FastAPI()
 
 
+async def _load_catalog():
+    await startup_event()
+    if await asyncio.to_thread(get_catalog) is None:
+        raise RuntimeError("route catalog is empty")
+
+
 @app.on_event("startup")
 async def _startup_event():
-    await startup_event()
-    upload_embeddings_if_missing()
+    # Accept traffic immediately; dependencies warm up in the background
+    # and /readyz reports when they are done.
+    app.state.warm_up_tasks = [
+        asyncio.create_task(warm_up("catalog", _load_catalog)),
+        asyncio.create_task(warm_up("chat_indexes", lambda: asyncio.to_thread(ensure_indexes))),
+        asyncio.create_task(warm_up("booking_indexes", lambda: asyncio.to_thread(ensure_booking_indexes))),
+        asyncio.create_task(warm_up("intent_model", lambda: asyncio.to_thread(warm_up_model))),
+        asyncio.create_task(warm_up("vector_index", lambda: asyncio.to_thread(sync_embeddings))),
+    ]
+    if WRITE_BEHIND_ENABLED:
+        transcript_writer.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown_event():
+    if WRITE_BEHIND_ENABLED:
+        # Drain queued transcript writes (or spill them to disk)
+        await asyncio.to_thread(transcript_writer.stop)
+
+app.include_router(chat_router)
+app.include_router(health_router)
 
-app.include_router(chat_router)
\ No newline at end of file
+if PROFILING_ENABLED:
+    # Off unless PROFILE_SAMPLE_RATE or PROFILE_SLOW_SECONDS is set
+    app.add_middleware(ProfilerMiddleware)
+    app.include_router(profiling_router)
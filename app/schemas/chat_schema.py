@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 
 class ChatInput(BaseModel):
     message: str
@@ -15,4 +15,6 @@ class ChatState(BaseModel):
     user_message: str
     intent: Optional[str] = None
     result: Any = None
-    thread_id: Optional[str] = None  # optional, can create new thread
\ No newline at end of file
+    thread_id: Optional[str] = None  # optional, can create new thread
+    context: Any = None  # TurnContext: history + dialog state loaded once per turn
+    slots: Optional[Dict[str, Any]] = None  # filled by the fused router; None means nodes extract themselves
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Catalog context for the booking prompt, pruned to what the current step needs.
+
+- No districts chosen yet: only the names of the districts we serve.
+- A district chosen: that district's points, with fares only for dropping
+  points, since pickup prices are never shown.
+- Both chosen: both districts' points and the providers serving both.
+
+The result is compact JSON with no indentation or spaces.
+"""
+import json
+from typing import Any, Dict, Optional
+
+from app.services.route_catalog import RouteCatalog
+
+
+def build_booking_context(catalog: RouteCatalog, booking_data: Optional[Dict[str, Any]]) -> str:
+    booking_data = booking_data or {}
+    district_from = catalog.district(booking_data.get("district_from"))
+    district_to = catalog.district(booking_data.get("district_to"))
+
+    context: Dict[str, Any] = {}
+    if not (district_from and district_to):
+        context["districts"] = catalog.district_names
+    if district_from:
+        context["from"] = {
+            "district": district_from["name"],
+            "pickup_points": [dp["name"] for dp in district_from.get("dropping_points", []) or []],
+        }
+    if district_to:
+        context["to"] = {
+            "district": district_to["name"],
+            "dropping_points": {
+                dp["name"]: dp.get("price") for dp in district_to.get("dropping_points", []) or []
+            },
+        }
+    if district_from and district_to:
+        context["providers"] = catalog.coverage.providers_serving(
+            district_from["name"], district_to["name"]
+        )
+    return json.dumps(context, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,356 @@
+"""
+Deterministic booking state machine used by ``book_ticket``.
+
+Each turn only the *delta* is extracted from the latest message: by the
+local extractors (``slot_extractor`` for phone, date and seats, and catalog
+name matching for districts, points, providers, plus the passenger name),
+by the fused router, or, when neither finds anything, by one small
+structured LLM call (``extract_delta``). Everything else happens in code:
+
+- ``apply_delta`` validates districts, pickup and dropping points and the
+  provider against the catalog, and sets ``fare`` from the dropping point.
+- ``next_field`` picks the next missing field in ``BOOKING_FIELDS`` order,
+  and ``question`` asks for it from a template.
+- ``summary`` and ``total_amount`` build the confirmation step.
+
+The booking data keeps ``awaiting``: the field last asked for, or
+``"confirm"`` once the summary was shown.
+"""
+import json
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.booking_context import build_booking_context
+from app.services.llm import complete
+from app.services.prompts import BOOK_TICKET_DELTA, format_history
+from app.services.route_catalog import RouteCatalog
+from app.services.slot_extractor import MAX_SEATS, extract_slots, local_today, normalize_phone, slot_values
+
+BOOKING_FIELDS = (
+    "district_from",
+    "district_to",
+    "pickup_point",
+    "dropping_point",
+    "bus_provider",
+    "date",
+    "seats",
+    "name",
+    "phone",
+)
+CONFIRM = "confirm"
+
+_YES_RE = re.compile(
+    r"^\s*(?:yes|y|yeah|yep|sure|ok|okay|confirm(?:ed)?|correct|go ahead|proceed|book it|please do)\b",
+    re.IGNORECASE,
+)
+_NO_RE = re.compile(r"^\s*(?:no|nope|not yet|wait|change|wrong)\b", re.IGNORECASE)
+_NAME_RE = re.compile(
+    r"\b(?:my name is|name is|name:)\s+([A-Za-z][A-Za-z.'\- ]{1,60}?)(?=\s*(?:[,.;\d]|\band\b|\bphone\b|$))",
+    re.IGNORECASE,
+)
+_BARE_NAME_RE = re.compile(r"^\s*([A-Za-z][A-Za-z.'\-]*(?:\s+[A-Za-z][A-Za-z.'\-]*){0,3})\s*$")
+_FROM_RE = re.compile(r"\b(?:from|pick\s*up(?:\s+(?:at|from))?|pickup(?:\s+(?:at|from))?|board(?:ing)?(?:\s+at)?)\s*$", re.IGNORECASE)
+_TO_RE = re.compile(r"\b(?:to|drop(?:\s*(?:off|ping))?(?:\s+(?:at|in))?|destination)\s*$", re.IGNORECASE)
+
+_DELTA_FIELDS = BOOKING_FIELDS + (CONFIRM,)
+DELTA_SCHEMA: Dict[str, Any] = {
+    "name": "booking_delta",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": list(_DELTA_FIELDS),
+        "properties": {
+            **{
+                field: {"type": ["integer" if field == "seats" else "string", "null"]}
+                for field in BOOKING_FIELDS
+            },
+            CONFIRM: {"type": ["boolean", "null"]},
+        },
+    },
+}
+
+
+def is_yes(message: str) -> bool:
+    return bool(_YES_RE.match(message))
+
+
+def is_no(message: str) -> bool:
+    return bool(_NO_RE.match(message))
+
+
+def _names_pattern(names: List[str]) -> Optional[re.Pattern]:
+    if not names:
+        return None
+    ordered = sorted(set(names), key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(n) for n in ordered) + r")\b", re.IGNORECASE)
+
+
+_patterns: Dict[Tuple[Optional[str], str], Optional[re.Pattern]] = {}
+
+
+def _pattern(catalog: RouteCatalog, kind: str) -> Optional[re.Pattern]:
+    key = (catalog.version, kind)
+    if key not in _patterns:
+        if kind == "districts":
+            names = catalog.district_names
+        elif kind == "points":
+            names = [dp["name"] for d in catalog.districts for dp in d.get("dropping_points", []) or [] if dp.get("name")]
+        else:
+            names = [p["name"] for p in catalog.bus_providers if p.get("name")]
+        _patterns[key] = _names_pattern(names)
+    return _patterns[key]
+
+
+def _role(text: str, start: int) -> Optional[str]:
+    before = text[max(0, start - 30):start]
+    if _FROM_RE.search(before):
+        return "from"
+    if _TO_RE.search(before):
+        return "to"
+    return None
+
+
+def _point_district(catalog: RouteCatalog, point: str) -> List[str]:
+    return [name for name in catalog.district_names if catalog.dropping_point(name, point)]
+
+
+def local_delta(catalog: RouteCatalog, message: str, data: Dict[str, Any], awaiting: Optional[str]) -> Dict[str, Any]:
+    """Delta found without the LLM: catalog names, name, phone, date and seats."""
+    delta: Dict[str, Any] = slot_values(extract_slots(message))
+    delta.pop("booking_id", None)
+
+    pattern = _pattern(catalog, "districts")
+    unlabelled = []
+    for match in pattern.finditer(message) if pattern else ():
+        district = catalog.district(match.group(1))["name"]
+        role = _role(message, match.start())
+        if role == "from":
+            delta["district_from"] = district
+        elif role == "to":
+            delta["district_to"] = district
+        else:
+            unlabelled.append(district)
+    for district in unlabelled:
+        # "Dhaka to Sylhet" or a bare answer: fill from, then to, in order
+        if awaiting == "district_to" and "district_to" not in delta:
+            delta["district_to"] = district
+        elif "district_from" not in delta and not data.get("district_from"):
+            delta["district_from"] = district
+        elif "district_to" not in delta:
+            delta["district_to"] = district
+
+    district_from = delta.get("district_from") or data.get("district_from")
+    district_to = delta.get("district_to") or data.get("district_to")
+    pattern = _pattern(catalog, "points")
+    for match in pattern.finditer(message) if pattern else ():
+        point = match.group(1)
+        districts = _point_district(catalog, point)
+        role = _role(message, match.start())
+        if district_from in districts and role != "to" and "pickup_point" not in delta:
+            delta["pickup_point"] = point
+        elif district_to in districts and role != "from" and "dropping_point" not in delta:
+            delta["dropping_point"] = point
+        elif len(districts) == 1 and not district_from and role != "to":
+            district_from = delta["district_from"] = districts[0]
+            delta["pickup_point"] = point
+        elif len(districts) == 1 and not district_to:
+            district_to = delta["district_to"] = districts[0]
+            delta["dropping_point"] = point
+
+    pattern = _pattern(catalog, "providers")
+    match = pattern.search(message) if pattern else None
+    if match:
+        delta["bus_provider"] = match.group(1)
+
+    match = _NAME_RE.search(message)
+    if match:
+        delta["name"] = match.group(1).strip()
+    elif awaiting == "name" and not delta and not is_yes(message) and not is_no(message):
+        match = _BARE_NAME_RE.match(message)
+        if match:
+            delta["name"] = match.group(1)
+    return delta
+
+
+async def extract_delta(
+    catalog: RouteCatalog,
+    message: str,
+    data: Dict[str, Any],
+    history: List[Dict[str, Any]],
+    today: str,
+) -> Dict[str, Any]:
+    """Ask the LLM only for what the latest message adds or changes."""
+    resp = await complete(
+        model="gpt-4o-mini",
+        temperature=0,
+        response_format={"type": "json_schema", "json_schema": DELTA_SCHEMA},
+        label="book_ticket.delta",
+        messages=BOOK_TICKET_DELTA.messages(
+            catalog=build_booking_context(catalog, data),
+            today=today,
+            history=format_history(history),
+            booking_data=json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str) if data else "None",
+            message=message,
+        ),
+    )
+    reply = json.loads(resp.choices[0].message.content)
+    return {field: value for field, value in reply.items() if value is not None}
+
+
+def _set(data: Dict[str, Any], field: str, value: Any, *dependents: str):
+    """Set ``field``; a changed value clears the fields that depended on the old one."""
+    if data.get(field) != value:
+        for dependent in dependents:
+            data.pop(dependent, None)
+    data[field] = value
+
+
+def apply_delta(
+    catalog: RouteCatalog, data: Dict[str, Any], delta: Dict[str, Any], today: Optional[date] = None
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Merge ``delta`` into a copy of ``data``, keeping only values valid against
+    the catalog. Returns the new data and user-facing notes on rejected values.
+    """
+    today = today or local_today()
+    data = dict(data)
+    problems: List[str] = []
+
+    for field, dependents in (
+        ("district_from", ("pickup_point", "bus_provider")),
+        ("district_to", ("dropping_point", "fare", "bus_provider")),
+    ):
+        if not delta.get(field):
+            continue
+        district = catalog.district(delta[field])
+        if district:
+            _set(data, field, district["name"], *dependents)
+        else:
+            problems.append(f"Sorry, we don't serve {delta[field]}.")
+
+    district_from, district_to = data.get("district_from"), data.get("district_to")
+    if district_from and district_to:
+        if district_from == district_to:
+            problems.append("The departure and destination districts must be different.")
+            data.pop("district_to", None)
+            data.pop("dropping_point", None)
+            data.pop("fare", None)
+        elif not catalog.coverage.providers_serving(district_from, district_to):
+            problems.append(f"Unfortunately no provider operates between {district_from} and {district_to}.")
+            data.pop("district_to", None)
+            data.pop("dropping_point", None)
+            data.pop("fare", None)
+        district_to = data.get("district_to")
+
+    if delta.get("pickup_point"):
+        point = catalog.dropping_point(district_from, delta["pickup_point"])
+        if point:
+            data["pickup_point"] = point["name"]
+        elif district_from:
+            problems.append(f"{delta['pickup_point']} is not a pickup point in {district_from}.")
+
+    if delta.get("dropping_point"):
+        point = catalog.dropping_point(district_to, delta["dropping_point"])
+        if point:
+            data["dropping_point"] = point["name"]
+        elif district_to:
+            problems.append(f"{delta['dropping_point']} is not a dropping point in {district_to}.")
+
+    # Fare always comes from the catalog, never from the message or the LLM
+    point = catalog.dropping_point(district_to, data.get("dropping_point"))
+    if point:
+        data["fare"] = point.get("price")
+    else:
+        data.pop("fare", None)
+
+    provider = delta.get("bus_provider") or data.get("bus_provider")
+    if provider:
+        found = catalog.provider(provider)
+        if not found:
+            problems.append(f"We don't work with {provider}.")
+            data.pop("bus_provider", None)
+        elif district_from and district_to and not catalog.coverage.serves(found["name"], district_from, district_to):
+            problems.append(f"{found['name']} doesn't operate between {district_from} and {district_to}.")
+            data.pop("bus_provider", None)
+        else:
+            data["bus_provider"] = found["name"]
+
+    if delta.get("date"):
+        try:
+            travel_date = date.fromisoformat(str(delta["date"]))
+        except ValueError:
+            problems.append("Please give the travel date as YYYY-MM-DD.")
+        else:
+            if travel_date < today:
+                problems.append(f"{travel_date.isoformat()} is in the past.")
+            else:
+                data["date"] = travel_date.isoformat()
+
+    if delta.get("seats") is not None:
+        try:
+            seats = int(delta["seats"])
+        except (TypeError, ValueError):
+            seats = 0
+        if 0 < seats <= MAX_SEATS:
+            data["seats"] = seats
+        else:
+            problems.append(f"You can book between 1 and {MAX_SEATS} seats.")
+
+    if delta.get("name"):
+        data["name"] = " ".join(str(delta["name"]).split()).title()
+
+    if delta.get("phone"):
+        phone = normalize_phone(delta["phone"])
+        if phone:
+            data["phone"] = phone
+        else:
+            problems.append(f"{delta['phone']} doesn't look like a Bangladeshi mobile number.")
+
+    return data, problems
+
+
+def next_field(data: Dict[str, Any]) -> Optional[str]:
+    return next((field for field in BOOKING_FIELDS if not data.get(field)), None)
+
+
+def question(catalog: RouteCatalog, data: Dict[str, Any], field: str) -> str:
+    district_from, district_to = data.get("district_from"), data.get("district_to")
+    if field == "district_from":
+        return f"Where will you travel from? We cover {', '.join(catalog.district_names)}."
+    if field == "district_to":
+        options = catalog.coverage.reachable_from(district_from) or catalog.district_names
+        return f"Where would you like to go from {district_from}? Options: {', '.join(options)}."
+    if field == "pickup_point":
+        points = [dp["name"] for dp in catalog.dropping_points(district_from)]
+        return f"Which pickup point in {district_from}? We have {', '.join(points)}."
+    if field == "dropping_point":
+        points = [f"{dp['name']} (৳{dp.get('price')})" for dp in catalog.dropping_points(district_to)]
+        return f"Which dropping point in {district_to}? We have {', '.join(points)}."
+    if field == "bus_provider":
+        providers = catalog.coverage.providers_serving(district_from, district_to)
+        return f"Which bus provider would you like? Available from {district_from} to {district_to}: {', '.join(providers)}."
+    if field == "date":
+        return "What date would you like to travel? (e.g. 2025-12-20 or \"tomorrow\")"
+    if field == "seats":
+        return "How many seats do you need?"
+    if field == "name":
+        return "What name should the ticket be booked under?"
+    return "What's your phone number?"
+
+
+def total_amount(data: Dict[str, Any]) -> int:
+    return (data.get("fare") or 0) * (data.get("seats") or 0)
+
+
+def summary(data: Dict[str, Any]) -> str:
+    return (
+        "Please confirm your booking:\n"
+        f"- {data['bus_provider']}: {data['district_from']} ({data['pickup_point']}) → "
+        f"{data['district_to']} ({data['dropping_point']})\n"
+        f"- Date: {data['date']}\n"
+        f"- Seats: {data['seats']} × ৳{data['fare']} = ৳{total_amount(data)}\n"
+        f"- Passenger: {data['name']}, {data['phone']}\n"
+        "Shall I book it? (yes/no)"
+    )
@@ -1,24 +1,43 @@
+import asyncio
+import hashlib
 import json
 from app.config import db
+from app.services.route_catalog import CATALOG_ID, invalidate_catalog
 
 collection = db["busses"]
 
-async def startup_event():
+def load_startup_data():
     try:
         with open("data.json", "r") as f:
             data = json.load(f)
 
+        districts = data.get("districts", [])
+        bus_providers = data.get("bus_providers", [])
+
+        # Content hash doubles as the catalog version (etag) checked by every worker
+        version = hashlib.sha256(
+            json.dumps([districts, bus_providers], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
         # Single object/document
         combined = {
-            "_id": "startup_data",
-            "districts": data.get("districts", []),
-            "bus_providers": data.get("bus_providers", [])
+            "_id": CATALOG_ID,
+            "version": version,
+            "districts": districts,
+            "bus_providers": bus_providers
         }
 
         # Insert or update
-        collection.replace_one({"_id": "startup_data"}, combined, upsert=True)
+        collection.replace_one({"_id": CATALOG_ID}, combined, upsert=True)
+        invalidate_catalog()
 
-        print("Data merged into one document.")
+        print(f"Data merged into one document (version {version}).")
 
     except Exception as e:
         print(f"Error loading data.json: {e}")
+        raise
+
+
+async def startup_event():
+    # pymongo blocks; keep it off the event loop
+    await asyncio.to_thread(load_startup_data)
@@ -0,0 +1,261 @@
+"""
+Record/replay cassettes for OpenAI chat and embedding calls.
+
+``LLM_CASSETTE_MODE``:
+- ``off`` (default): calls go to the API unchanged.
+- ``record``: calls go to the API and each request/response pair is appended
+  to the cassette.
+- ``replay``: calls are answered from the cassette, after a synthetic delay of
+  ``LLM_CASSETTE_LATENCY`` seconds (``0.3`` or a ``0.2-0.6`` range). A request
+  that was never recorded raises ``CassetteMiss``.
+
+Requests are keyed by a hash of the model, the messages or input, and the
+response options. UUIDs, dates, times, ``datetime(...)`` reprs and
+Bangladeshi mobile numbers are masked before hashing, so booking IDs, thread
+IDs, message timestamps, "CURRENT DATE" and each load-test user's phone don't
+break replay. Repeated requests replay their recordings in order.
+
+The cassette (``LLM_CASSETTE_PATH``) is gzip-compressed JSON lines. Stream
+responses are stored as final text plus usage. Embeddings are stored as
+base64 float32.
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "benchmarks/cassettes/llm.jsonl.gz")
+CASSETTE_LATENCY = os.getenv("LLM_CASSETTE_LATENCY", "0")
+
+_KEY_FIELDS = ("model", "messages", "input", "response_format", "temperature", "stream")
+
+_VOLATILE = [
+    (re.compile(r"datetime\.(?:datetime|date)\([^)]*\)"), "<date>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"\b[0-9a-f]{32}\b", re.I), "<uuid>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?\b"), "<date>"),
+    (re.compile(r"(?<![\d+])(?:\+?88)?01[3-9]\d{8}(?!\d)"), "<phone>"),
+]
+
+
+class CassetteMiss(KeyError):
+    """Replay mode got a request that was never recorded."""
+
+
+def normalize(text: str) -> str:
+    for pattern, placeholder in _VOLATILE:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def request_key(kind: str, kwargs: Dict[str, Any]) -> str:
+    payload = {field: kwargs[field] for field in _KEY_FIELDS if field in kwargs}
+    text = normalize(json.dumps([kind, payload], sort_keys=True, default=str, ensure_ascii=False))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+def _latency(spec: str) -> float:
+    low, _, high = spec.partition("-")
+    return random.uniform(float(low), float(high)) if high else float(low or 0)
+
+
+def _pack_vectors(response: Dict[str, Any]) -> Dict[str, Any]:
+    import numpy as np
+
+    for item in response.get("data", []):
+        vector = np.asarray(item.pop("embedding"), dtype=np.float32)
+        item["embedding_b64"] = base64.b64encode(vector.tobytes()).decode("ascii")
+    return response
+
+
+def _unpack_vectors(response: Dict[str, Any]) -> Dict[str, Any]:
+    import numpy as np
+
+    response = json.loads(json.dumps(response))
+    for item in response.get("data", []):
+        raw = base64.b64decode(item.pop("embedding_b64"))
+        item["embedding"] = np.frombuffer(raw, dtype=np.float32).tolist()
+    return response
+
+
+class Cassette:
+    def __init__(self, path: str = CASSETTE_PATH):
+        self.path = path
+        self._entries: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._played: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict[str, Any]]] = {}
+            if os.path.exists(self.path):
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries.setdefault(entry["key"], []).append(entry)
+            self._entries = entries
+        return self._entries
+
+    def lookup(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            recorded = self._load().get(key)
+            if not recorded:
+                raise CassetteMiss(key)
+            index = self._played.get(key, 0)
+            self._played[key] = index + 1
+            return recorded[index % len(recorded)]
+
+    def append(self, key: str, kind: str, response: Dict[str, Any]):
+        entry = {"key": key, "kind": kind, "response": response}
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+            self._load().setdefault(key, []).append(entry)
+
+
+def _dump(response: Any) -> Dict[str, Any]:
+    return response.model_dump(exclude_none=True)
+
+
+def _chat_completion(data: Dict[str, Any]):
+    from openai.types.chat import ChatCompletion
+
+    return ChatCompletion.model_validate(data)
+
+
+def _embedding_response(data: Dict[str, Any]):
+    from openai.types import CreateEmbeddingResponse
+
+    return CreateEmbeddingResponse.model_validate(_unpack_vectors(data))
+
+
+def _stream_chunks(data: Dict[str, Any]):
+    """Rebuild stream chunks from recorded text: one chunk per word, then usage."""
+    from openai.types.chat import ChatCompletionChunk
+
+    base = {"id": "replay", "object": "chat.completion.chunk", "created": 0, "model": data.get("model", "")}
+    words = re.findall(r"\S+\s*|\s+", data.get("content", ""))
+    for word in words:
+        yield ChatCompletionChunk.model_validate(
+            {**base, "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+        )
+    yield ChatCompletionChunk.model_validate({**base, "choices": [], "usage": data.get("usage")})
+
+
+class _RecordingStream:
+    """Passes stream chunks through and records the full text when it ends."""
+
+    def __init__(self, stream, on_done):
+        self._stream = stream
+        self._on_done = on_done
+        self._parts: List[str] = []
+        self._usage = None
+        self._model = ""
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        async for chunk in self._stream:
+            self._model = chunk.model or self._model
+            if getattr(chunk, "usage", None):
+                self._usage = chunk.usage.model_dump(exclude_none=True)
+            if chunk.choices and chunk.choices[0].delta.content:
+                self._parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        self._on_done({"model": self._model, "content": "".join(self._parts), "usage": self._usage})
+
+
+async def _replay_stream(data: Dict[str, Any]):
+    for chunk in _stream_chunks(data):
+        yield chunk
+
+
+class _AsyncCreate:
+    def __init__(self, create, kind: str, cassette: Cassette, mode: str, latency: str):
+        self._create = create
+        self._kind = kind
+        self._cassette = cassette
+        self._mode = mode
+        self._latency = latency
+
+    async def create(self, **kwargs):
+        kind = f"{self._kind}.stream" if kwargs.get("stream") else self._kind
+        key = request_key(kind, kwargs)
+        if self._mode == "replay":
+            data = self._cassette.lookup(key)["response"]
+            await asyncio.sleep(_latency(self._latency))
+            return _rebuild(kind, data)
+
+        response = await self._create(**kwargs)
+        if kind.endswith(".stream"):
+            return _RecordingStream(response, lambda data: self._cassette.append(key, kind, data))
+        self._cassette.append(key, kind, _record(kind, response))
+        return response
+
+
+class _SyncCreate(_AsyncCreate):
+    def create(self, **kwargs):
+        key = request_key(self._kind, kwargs)
+        if self._mode == "replay":
+            data = self._cassette.lookup(key)["response"]
+            time.sleep(_latency(self._latency))
+            return _rebuild(self._kind, data)
+        response = self._create(**kwargs)
+        self._cassette.append(key, self._kind, _record(self._kind, response))
+        return response
+
+
+def _record(kind: str, response: Any) -> Dict[str, Any]:
+    data = _dump(response)
+    return _pack_vectors(data) if kind == "embeddings" else data
+
+
+def _rebuild(kind: str, data: Dict[str, Any]):
+    if kind == "chat.stream":
+        return _replay_stream(data)
+    if kind == "embeddings":
+        return _embedding_response(data)
+    return _chat_completion(data)
+
+
+class _Namespace:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+class CassetteClient:
+    """Stands in for an OpenAI client: ``chat.completions.create`` and ``embeddings.create``."""
+
+    def __init__(self, client, cassette: Cassette, mode: str, latency: str = CASSETTE_LATENCY, sync: bool = False):
+        wrapper = _SyncCreate if sync else _AsyncCreate
+        self._client = client
+        self.chat = _Namespace(completions=wrapper(client.chat.completions.create, "chat", cassette, mode, latency))
+        self.embeddings = wrapper(client.embeddings.create, "embeddings", cassette, mode, latency)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_cassette: Optional[Cassette] = None
+
+
+def wrap_client(client, sync: bool = False):
+    """Return ``client`` unchanged, or wrapped for record/replay per ``LLM_CASSETTE_MODE``."""
+    global _cassette
+    if CASSETTE_MODE not in ("record", "replay"):
+        return client
+    if _cassette is None:
+        _cassette = Cassette()
+    print(f"LLM cassette: {CASSETTE_MODE} ({CASSETTE_PATH})")
+    return CassetteClient(client, _cassette, CASSETTE_MODE, sync=sync)
@@ -7,17 +7,18 @@ from app.services.langgraph_nodes.book_ticket import book_ticket
 from app.services.langgraph_nodes.view_ticket import view_ticket
 from app.services.langgraph_nodes.cancel_ticket import cancel_ticket
 from app.services.langgraph_nodes.general_chat import general_chat
+from app.services.metrics import instrument_node
 
 
 
 graph = StateGraph(ChatState)
-graph.add_node("general_chat", general_chat)
-graph.add_node("detect_intent", detect_intent)
-graph.add_node("ask_for_info", ask_for_info)
-graph.add_node("provider_info", provider_info)
-graph.add_node("book_ticket", book_ticket)
-graph.add_node("view_ticket", view_ticket)
-graph.add_node("cancel_ticket", cancel_ticket)
+graph.add_node("general_chat", instrument_node("general_chat", general_chat))
+graph.add_node("detect_intent", instrument_node("detect_intent", detect_intent))
+graph.add_node("ask_for_info", instrument_node("ask_for_info", ask_for_info))
+graph.add_node("provider_info", instrument_node("provider_info", provider_info))
+graph.add_node("book_ticket", instrument_node("book_ticket", book_ticket))
+graph.add_node("view_ticket", instrument_node("view_ticket", view_ticket))
+graph.add_node("cancel_ticket", instrument_node("cancel_ticket", cancel_ticket))
 graph.set_entry_point("detect_intent")
 graph.add_conditional_edges(
     "detect_intent",
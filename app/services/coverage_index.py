@@ -0,0 +1,105 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+def _set_bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class CoverageIndex:
+    """
+    Bitset index of which bus providers cover which districts.
+
+    Every district gets a bit position and every provider a bit position.
+    Each district stores the mask of providers serving it and each provider
+    stores the mask of districts it covers, so route questions become a few
+    integer ANDs regardless of how many operators are loaded.
+    """
+
+    def __init__(self, district_names: Iterable[str], providers: List[Dict[str, Any]]):
+        self.district_names: List[str] = []
+        self._district_bit: Dict[str, int] = {}
+        self._district_providers: List[int] = []
+        for name in district_names:
+            self._add_district(name)
+
+        self.provider_names: List[str] = []
+        self._provider_bit: Dict[str, int] = {}
+        self._provider_districts: List[int] = []
+
+        for provider in providers:
+            name = provider.get("name")
+            if not name or name.strip().lower() in self._provider_bit:
+                continue
+            bit = len(self.provider_names)
+            self.provider_names.append(name)
+            self._provider_bit[name.strip().lower()] = bit
+
+            mask = 0
+            for district in provider.get("coverage_districts", []) or []:
+                d_bit = self._add_district(district)
+                mask |= 1 << d_bit
+                self._district_providers[d_bit] |= 1 << bit
+            self._provider_districts.append(mask)
+
+    def _add_district(self, name: str) -> int:
+        key = name.strip().lower()
+        if key not in self._district_bit:
+            self._district_bit[key] = len(self.district_names)
+            self.district_names.append(name)
+            self._district_providers.append(0)
+        return self._district_bit[key]
+
+    def _district(self, name: Optional[str]) -> Optional[int]:
+        return self._district_bit.get(name.strip().lower()) if name else None
+
+    def _provider(self, name: Optional[str]) -> Optional[int]:
+        return self._provider_bit.get(name.strip().lower()) if name else None
+
+    def providers_mask(self, *districts: str) -> int:
+        """Mask of providers covering every given district (0 if any is unknown)."""
+        mask = (1 << len(self.provider_names)) - 1
+        for district in districts:
+            bit = self._district(district)
+            if bit is None:
+                return 0
+            mask &= self._district_providers[bit]
+        return mask
+
+    def providers_serving(self, *districts: str) -> List[str]:
+        """Providers covering all of ``districts``, in catalog order."""
+        return [self.provider_names[b] for b in _set_bits(self.providers_mask(*districts))]
+
+    def count_serving(self, *districts: str) -> int:
+        return self.providers_mask(*districts).bit_count()
+
+    def serves(self, provider: Optional[str], *districts: str) -> bool:
+        bit = self._provider(provider)
+        if bit is None:
+            return False
+        return bool(self.providers_mask(*districts) >> bit & 1)
+
+    def reachable_from(self, district: str, provider: Optional[str] = None) -> List[str]:
+        """
+        Districts reachable from ``district``, optionally with one provider only.
+        """
+        d_bit = self._district(district)
+        if d_bit is None:
+            return []
+
+        if provider is not None:
+            p_bit = self._provider(provider)
+            if p_bit is None:
+                return []
+            mask = self._provider_districts[p_bit]
+            if not mask >> d_bit & 1:
+                return []
+        else:
+            mask = 0
+            for p_bit in _set_bits(self._district_providers[d_bit]):
+                mask |= self._provider_districts[p_bit]
+
+        mask &= ~(1 << d_bit)
+        return [self.district_names[b] for b in _set_bits(mask)]
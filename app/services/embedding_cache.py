@@ -0,0 +1,57 @@
+import hashlib
+import os
+import sqlite3
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite3")
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk cache of embeddings keyed by (model, sha256(text)).
+
+    Vectors are stored as float32 blobs in a single SQLite file, so re-ingesting
+    an unchanged corpus never calls the embeddings API.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, digest))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def get_many(self, model: str, digests: Iterable[str]) -> Dict[str, List[float]]:
+        digests = list(set(digests))
+        found: Dict[str, List[float]] = {}
+        with self._connect() as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(digests), 500):
+                batch = digests[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE model = ? "
+                    f"AND digest IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                )
+                for digest, blob in rows:
+                    found[digest] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[str, List[float]]]):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, vector) VALUES (?, ?, ?)",
+                [(model, digest, array("f", vector).tobytes()) for digest, vector in items],
+            )
@@ -0,0 +1,84 @@
+"""
+Fused router: one structured LLM call returns the intent together with the
+slots that intent needs, so the intent node's extraction call is skipped.
+
+Enabled with ``FUSED_ROUTER=1``. The reply is constrained by a strict JSON
+schema; every slot is present and ``null`` when the user did not state it.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.intent_classifier import INTENTS
+from app.services.llm import complete
+from app.services.prompts import FUSED_ROUTER, format_history
+
+FUSED_ROUTER_ENABLED = os.getenv("FUSED_ROUTER", "0") == "1"
+
+SLOT_FIELDS = (
+    "from_district",
+    "to_district",
+    "pickup_point",
+    "dropping_point",
+    "bus_provider",
+    "name",
+    "phone",
+    "date",
+    "seats",
+    "booking_id",
+)
+
+
+def _nullable(kind: str) -> Dict[str, Any]:
+    return {"type": [kind, "null"]}
+
+
+ROUTER_SCHEMA: Dict[str, Any] = {
+    "name": "route_and_slots",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["intent", "slots"],
+        "properties": {
+            "intent": {"type": "string", "enum": list(INTENTS)},
+            "slots": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": list(SLOT_FIELDS),
+                "properties": {
+                    field: _nullable("integer" if field == "seats" else "string")
+                    for field in SLOT_FIELDS
+                },
+            },
+        },
+    },
+}
+
+
+async def route_and_extract(
+    user_message: str,
+    history: List[Dict[str, Any]],
+    today: str,
+    district_names: Sequence[str] = (),
+    provider_names: Sequence[str] = (),
+    booking_data: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Return ``(intent, slots)`` for the latest message in one call."""
+    resp = await complete(
+        model="gpt-4o-mini",
+        temperature=0,
+        response_format={"type": "json_schema", "json_schema": ROUTER_SCHEMA},
+        label="fused_router",
+        messages=FUSED_ROUTER.messages(
+            districts=list(district_names),
+            providers=list(provider_names),
+            today=today,
+            history=format_history(history),
+            booking_data=json.dumps(booking_data, default=str) if booking_data else "None",
+            message=user_message,
+        ),
+    )
+    data = json.loads(resp.choices[0].message.content)
+    slots = {field: data.get("slots", {}).get(field) for field in SLOT_FIELDS}
+    return data["intent"], slots
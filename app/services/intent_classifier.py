@@ -0,0 +1,184 @@
+"""
+Local fast-path intent classifier that runs in front of the LLM router.
+
+Tier 1 is a small set of regex rules for unambiguous phrasings; tier 2 is a
+multinomial logistic regression over hashed word and character n-grams,
+trained once on ``INTENT_EXAMPLES`` at startup warm-up (or on first use).
+A prediction is only returned when its confidence clears
+``FAST_PATH_THRESHOLD``; otherwise the caller falls back to the LLM.
+"""
+import math
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+
+from app.services.intent_examples import INTENT_EXAMPLES
+from app.services.metrics import observe_intent_route
+
+INTENTS = (
+    "general_chat",
+    "ask_for_info",
+    "provider_info",
+    "book_ticket",
+    "view_ticket",
+    "cancel_ticket",
+)
+
+FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH", "1") != "0"
+FAST_PATH_THRESHOLD = float(os.getenv("INTENT_FAST_PATH_THRESHOLD", "0.85"))
+
+_HASH_BUCKETS = 1 << 14
+_EPOCHS = 20
+_LEARNING_RATE = 0.5
+_WEIGHT_DECAY = 0.9  # per-epoch shrinkage keeps probabilities calibrated
+
+
+class IntentPrediction(NamedTuple):
+    intent: str
+    confidence: float
+    tier: str  # "rule" or "model"
+
+
+# Checked in order; the first match wins.
+_RULES: List[Tuple[str, Pattern[str]]] = [
+    # Only an action on a ticket, so "refund policy of hanif ticket" is left to provider_info
+    ("cancel_ticket", re.compile(
+        r"\b(cancel|cancell?ing|refund) ((my|the|a|this|that|our|all) (\w+ ){0,2})?(ticket|booking|reservation|seat)s?\b"
+        r"|\brefund (for|on) (my|the|this|that|our) (\w+ ){0,2}(ticket|booking|reservation|seat)s?\b"
+        r"|\b(ticket|booking|reservation)s?\b.*\bcancel(led)?\b"
+    )),
+    ("view_ticket", re.compile(r"\b(show|view|see|check|list|display)\b.*\b(my|booked)\b.*\b(ticket|booking|reservation)s?\b")),
+    ("book_ticket", re.compile(r"\b(book|reserve)\b.*\b(ticket|seat|bus)s?\b|^(i want to |i'd like to |please )?book\b")),
+    ("general_chat", re.compile(r"^(hi+|hello+|hey+|salam|assalamu ?alaikum|good (morning|afternoon|evening))( there)?[\s!.,]*$")),
+    ("general_chat", re.compile(r"^(thanks|thank you|thx|ty)( so much| a lot| very much)?[\s!.]*$")),
+    ("general_chat", re.compile(r"^(bye|goodbye|see you( later)?)[\s!.]*$")),
+]
+
+_PROVIDER_DETAIL = r"\b(contact|number|phone|hotline|address|office|counter|website|policy|location|support|about|details?)\b"
+
+_counts: Dict[str, int] = {"rule": 0, "model": 0, "llm": 0}
+
+
+def _count(tier: str):
+    _counts[tier] += 1
+    observe_intent_route(tier)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def _features(text: str) -> List[int]:
+    words = re.findall(r"[a-z0-9']+", text)
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return [zlib.crc32(g.encode("utf-8")) % _HASH_BUCKETS for g in grams]
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+def _train(examples: Iterable[Tuple[str, str]]) -> List[List[float]]:
+    weights = [[0.0] * _HASH_BUCKETS for _ in INTENTS]
+    data = [(INTENTS.index(label), _features(_normalize(text))) for label, text in examples]
+    for epoch in range(_EPOCHS):
+        rate = _LEARNING_RATE / (1 + epoch * 0.1)
+        for label, feats in data:
+            probs = _softmax([sum(w[f] for f in feats) for w in weights])
+            for k, w in enumerate(weights):
+                grad = (1.0 if k == label else 0.0) - probs[k]
+                if grad:
+                    for f in feats:
+                        w[f] += rate * grad
+        for w in weights:
+            for f in range(_HASH_BUCKETS):
+                if w[f]:
+                    w[f] *= _WEIGHT_DECAY
+    return weights
+
+
+_weights: Optional[List[List[float]]] = None
+
+
+def warm_up_model():
+    """Train the local model now instead of on the first classified message."""
+    global _weights
+    if _weights is None:
+        _weights = _train(INTENT_EXAMPLES)
+
+
+@lru_cache(maxsize=8)
+def _provider_pattern(provider_names: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    if not provider_names:
+        return None
+    names = "|".join(re.escape(n.lower()) for n in sorted(provider_names, key=len, reverse=True))
+    return re.compile(rf"\b({names})\b.*{_PROVIDER_DETAIL}|{_PROVIDER_DETAIL}.*\b({names})\b")
+
+
+def _predict_rules(text: str, provider_names: Tuple[str, ...]) -> Optional[str]:
+    for intent, pattern in _RULES:
+        if pattern.search(text):
+            return intent
+    provider_pattern = _provider_pattern(provider_names)
+    if provider_pattern and provider_pattern.search(text):
+        return "provider_info"
+    return None
+
+
+def _predict_model(text: str) -> Tuple[str, float]:
+    feats = _features(text)
+    if not feats:
+        return "general_chat", 0.0
+    warm_up_model()
+    probs = _softmax([sum(w[f] for f in feats) for w in _weights])
+    best = max(range(len(INTENTS)), key=probs.__getitem__)
+    return INTENTS[best], probs[best]
+
+
+def classify_intent(
+    message: str,
+    provider_names: Iterable[str] = (),
+    in_dialog: bool = False,
+) -> Optional[IntentPrediction]:
+    """
+    Return a confident local prediction, or None when the LLM should decide.
+
+    ``in_dialog`` means the bot is waiting for an answer (a booking or
+    cancellation is in progress, or the last reply asked a question); only
+    explicit rule matches are trusted then, since short replies like "yes",
+    "Gabtoli" or a phone number depend on context.
+    """
+    if not FAST_PATH_ENABLED:
+        _count("llm")
+        return None
+
+    text = _normalize(message)
+    intent = _predict_rules(text, tuple(provider_names))
+    if intent:
+        _count("rule")
+        return IntentPrediction(intent, 1.0, "rule")
+
+    if not in_dialog:
+        intent, confidence = _predict_model(text)
+        if confidence >= FAST_PATH_THRESHOLD:
+            _count("model")
+            return IntentPrediction(intent, confidence, "model")
+
+    _count("llm")
+    return None
+
+
+def fast_path_stats() -> Dict[str, float]:
+    """Counters for each tier plus the share of turns that skipped the LLM (``/llm/stats``)."""
+    total = sum(_counts.values())
+    hits = _counts["rule"] + _counts["model"]
+    return {**_counts, "total": total, "hit_rate": hits / total if total else 0.0}
@@ -0,0 +1,103 @@
+"""
+Seed utterances used to train the local intent model.
+
+Keep examples short and unambiguous; anything context-dependent (bare
+district names, "yes", phone numbers) should be left to the LLM.
+"""
+
+INTENT_EXAMPLES = [
+    # general_chat
+    ("general_chat", "hi"),
+    ("general_chat", "hello"),
+    ("general_chat", "hey there"),
+    ("general_chat", "hello how are you"),
+    ("general_chat", "good morning"),
+    ("general_chat", "assalamu alaikum"),
+    ("general_chat", "thank you"),
+    ("general_chat", "thanks a lot"),
+    ("general_chat", "thank you so much for your help"),
+    ("general_chat", "what can you do"),
+    ("general_chat", "who are you"),
+    ("general_chat", "what is your name"),
+    ("general_chat", "tell me a joke"),
+    ("general_chat", "how is the weather today"),
+    ("general_chat", "bye"),
+    ("general_chat", "see you later"),
+    ("general_chat", "nice talking to you"),
+    ("general_chat", "you are helpful"),
+    # ask_for_info
+    ("ask_for_info", "is there any bus from dhaka to sylhet"),
+    ("ask_for_info", "which buses go from dhaka to chattogram"),
+    ("ask_for_info", "what is the fare from dhaka to khulna"),
+    ("ask_for_info", "how much is the ticket price to rajshahi"),
+    ("ask_for_info", "what are the dropping points in chattogram"),
+    ("ask_for_info", "dropping points in sylhet"),
+    ("ask_for_info", "bus route from rangpur to dhaka"),
+    ("ask_for_info", "do you have buses to barishal"),
+    ("ask_for_info", "which operators cover comilla"),
+    ("ask_for_info", "what time does the bus leave for khulna"),
+    ("ask_for_info", "are seats available to bogra"),
+    ("ask_for_info", "show me routes from mymensingh"),
+    ("ask_for_info", "fare list for dhaka"),
+    ("ask_for_info", "how much does it cost to go to sylhet"),
+    ("ask_for_info", "which providers go between dhaka and rangpur"),
+    ("ask_for_info", "where can i get off in rajshahi"),
+    ("ask_for_info", "which bus companies serve sylhet"),
+    ("ask_for_info", "pickup points in dhaka"),
+    # provider_info
+    ("provider_info", "hanif contact number"),
+    ("provider_info", "green line office address"),
+    ("provider_info", "what is the hotline of shyamoli"),
+    ("provider_info", "soudia customer support number"),
+    ("provider_info", "tell me about ena transport"),
+    ("provider_info", "desh travel privacy policy"),
+    ("provider_info", "where is the hanif counter"),
+    ("provider_info", "what is green line website"),
+    ("provider_info", "contact information of shyamoli paribahan"),
+    ("provider_info", "ena office location"),
+    ("provider_info", "details about the bus company soudia"),
+    ("provider_info", "how do i contact desh travel"),
+    ("provider_info", "privacy policy of green line"),
+    ("provider_info", "hanif head office"),
+    # book_ticket
+    ("book_ticket", "i want to book a ticket"),
+    ("book_ticket", "book a bus ticket from dhaka to sylhet"),
+    ("book_ticket", "book me a seat"),
+    ("book_ticket", "i need to reserve two seats"),
+    ("book_ticket", "reserve a ticket for tomorrow"),
+    ("book_ticket", "i would like to book a ticket to chattogram"),
+    ("book_ticket", "can you book a ticket for me"),
+    ("book_ticket", "book ticket"),
+    ("book_ticket", "make a booking"),
+    ("book_ticket", "i want to buy a bus ticket"),
+    ("book_ticket", "purchase a ticket to khulna"),
+    ("book_ticket", "help me book a seat on hanif"),
+    ("book_ticket", "new booking please"),
+    ("book_ticket", "reserve seats for my family"),
+    # view_ticket
+    ("view_ticket", "show my tickets"),
+    ("view_ticket", "view my booking"),
+    ("view_ticket", "check my tickets"),
+    ("view_ticket", "i want to see my booked tickets"),
+    ("view_ticket", "list my bookings"),
+    ("view_ticket", "what tickets do i have"),
+    ("view_ticket", "show booking history"),
+    ("view_ticket", "my ticket details"),
+    ("view_ticket", "can i see my reservation"),
+    ("view_ticket", "check booking status"),
+    ("view_ticket", "display my tickets"),
+    ("view_ticket", "did my booking go through"),
+    # cancel_ticket
+    ("cancel_ticket", "cancel my ticket"),
+    ("cancel_ticket", "i want to cancel my booking"),
+    ("cancel_ticket", "please cancel the reservation"),
+    ("cancel_ticket", "cancel ticket"),
+    ("cancel_ticket", "cancel my booking for tomorrow"),
+    ("cancel_ticket", "i need to cancel a ticket"),
+    ("cancel_ticket", "how do i cancel my ticket"),
+    ("cancel_ticket", "refund my ticket"),
+    ("cancel_ticket", "i don't want to travel anymore cancel it"),
+    ("cancel_ticket", "remove my booking"),
+    ("cancel_ticket", "cancel reservation"),
+    ("cancel_ticket", "i want a refund for my booking"),
+]
@@ -1,18 +1,20 @@
+import asyncio
 import json
 from typing import Any, Dict, List, Optional
 
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, bus_collection
+from app.services.llm import complete, stream_chat
+from app.services.prompts import ROUTE_ANSWER, ROUTE_FIELDS
+from app.services.route_catalog import get_catalog
+from app.services.seat_inventory import SEATS_PER_TRIP, availability, trip_key
+from app.services.slot_extractor import extract_slots
 
 
-def _format_chat_history(chat: Optional[Dict[str, Any]]) -> str:
-    if not chat:
-        return "No prior conversation."
-    history = chat.get("chat", []) or []
+def _format_chat_history(history: List[Dict[str, Any]]) -> str:
     if not history:
         return "No prior conversation."
     lines: List[str] = []
-    for msg in history[-10:]:
+    for msg in history:
         user_part = msg.get("user")
         bot_part = msg.get("bot")
         if user_part:
@@ -22,53 +24,23 @@ def _format_chat_history(chat: Optional[Dict[str, Any]]) -> str:
     return "\n".join(lines) or "No prior conversation."
 
 
-def _extract_route_fields(
+async def _extract_route_fields(
     user_message: str,
     chat_history_text: str,
     district_names: List[str],
 ):
-    prompt = f"""
-You are given the user's latest message, recent chat history, and the list of districts we serve.
-Determine the most likely departure (from_district) and destination (to_district) districts the user is asking about.
-Only use district names from this list: {district_names}.
-
-Return a JSON object with keys:
-- from_district: district name or null
-- to_district: district name or null
-- missing_fields: array containing any field names you could not determine (use "from_district" and/or "to_district")
-
-CHAT HISTORY:
-{chat_history_text}
-
-LATEST USER MESSAGE:
-{user_message}
-"""
-
-    resp = client.chat.completions.create(
+    resp = await complete(
         model="gpt-4o-mini",
         response_format={"type": "json_object"},
         temperature=0,
-        messages=[{"role": "user", "content": prompt}],
+        label="ask_for_info.extract",
+        messages=ROUTE_FIELDS.messages(
+            districts=district_names, history=chat_history_text, message=user_message
+        ),
     )
     return json.loads(resp.choices[0].message.content)
 
 
-def _matching_providers(
-    providers: List[Dict[str, Any]],
-    from_district: str,
-    to_district: str,
-) -> List[str]:
-    matches: List[str] = []
-    for provider in providers:
-        coverage = provider.get("coverage_districts", []) or []
-        if (
-            from_district in coverage
-            and to_district in coverage
-        ):
-            matches.append(provider.get("name", "Unknown"))
-    return matches
-
-
 def _build_missing_message(missing_fields: List[str], district_names: List[str]) -> str:
     prompts: List[str] = []
     readable_names = ", ".join(district_names)
@@ -92,6 +64,8 @@ def _compose_info_message(
     to_district: str,
     providers: List[str],
     dropping_points: List[Dict[str, Any]],
+    travel_date: Optional[str] = None,
+    seats_left: Optional[Dict[str, int]] = None,
 ) -> str:
     lines = [f"Yes, buses operate from {from_district} to {to_district}."]
     if providers:
@@ -118,63 +92,57 @@ def _compose_info_message(
                 f"Fares typically range from ৳{min(fare_values)} to ৳{max(fare_values)} per seat."
             )
 
-    lines.append("Let me know if you need schedules or seat availability details.")
+    if travel_date and seats_left:
+        lines.append(
+            f"Seats left on {travel_date}: "
+            + ", ".join(f"{name} ({count})" for name, count in seats_left.items())
+            + "."
+        )
+        lines.append("Let me know if you'd like to book.")
+    else:
+        lines.append("Let me know if you need schedules or seat availability details.")
     return "\n".join(lines)
 
 
-def _fallback_freeform_response(
+async def _fallback_freeform_response(
     user_message: str,
     dataset: Dict[str, Any],
     chat_history_text: str,
 ):
-    prompt = f"""
-You are a bus route search assistant.
-
-Use the conversation history and the structured data to answer the user's question with accurate, concise information.
-
-CHAT HISTORY:
-{chat_history_text}
-
-USER MESSAGE:
-{user_message}
-
-DISTRICTS WITH DROPPING POINTS:
-{dataset.get('districts')}
-
-BUS PROVIDERS:
-{dataset.get('bus_providers')}
-
-Rules:
-- Mention only bus providers that cover both the departure and destination districts.
-- Reference the relevant dropping points and fares when possible.
-- Keep the response short and natural. Do NOT respond in JSON.
-"""
-
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+    messages = ROUTE_ANSWER.messages(
+        districts=dataset.get('districts'),
+        providers=dataset.get('bus_providers'),
+        history=chat_history_text,
+        message=user_message,
     )
-    return resp.choices[0].message.content.strip()
+    reply = await stream_chat(messages, label="ask_for_info.fallback")
+    return reply.strip()
 
 
-def ask_for_info(state: ChatState):
-    dataset = bus_collection.find_one({}, {"districts": 1, "bus_providers": 1})
-    if not dataset:
+async def ask_for_info(state: ChatState):
+    catalog = await asyncio.to_thread(get_catalog)
+    if not catalog:
         state.result = "Sorry, I couldn't load the route information right now. Please try again later."
         return state
 
-    districts = dataset.get("districts", []) or []
-    bus_providers = dataset.get("bus_providers", []) or []
-    district_names = [d.get("name") for d in districts if d.get("name")]
+    dataset = catalog.dataset
+    district_names = catalog.district_names
 
-    chat = chat_collection.find_one({"thread_id": state.thread_id}, {"chat": {"$slice": -10}})
-    chat_history_text = _format_chat_history(chat)
+    chat_history_text = _format_chat_history(state.context.history_for(10))
 
-    try:
-        route_data = _extract_route_fields(state.user_message, chat_history_text, district_names)
-    except Exception:
-        state.result = _fallback_freeform_response(state.user_message, dataset, chat_history_text)
-        return state
+    if state.slots is not None:
+        # Already extracted by the fused router
+        route_data = {
+            "from_district": state.slots.get("from_district"),
+            "to_district": state.slots.get("to_district"),
+        }
+        route_data["missing_fields"] = [field for field, value in route_data.items() if not value]
+    else:
+        try:
+            route_data = await _extract_route_fields(state.user_message, chat_history_text, district_names)
+        except Exception:
+            state.result = await _fallback_freeform_response(state.user_message, dataset, chat_history_text)
+            return state
 
     missing_fields = route_data.get("missing_fields") or []
     from_district = route_data.get("from_district")
@@ -184,15 +152,24 @@ def ask_for_info(state: ChatState):
         state.result = _build_missing_message(missing_fields, district_names)
         return state
 
-    dropping_points = next(
-        (
-            d.get("dropping_points", [])
-            for d in districts
-            if d.get("name", "").lower() == to_district.lower()
-        ),
-        [],
+    dropping_points = catalog.dropping_points(to_district)
+
+    providers = catalog.coverage.providers_serving(from_district, to_district)
+
+    # Seat availability when the user named a travel date
+    travel_date = (state.slots or {}).get("date")
+    if not travel_date and "date" in (slots := extract_slots(state.user_message)):
+        travel_date = slots["date"].value
+    seats_left = None
+    if travel_date and providers:
+        keys = {name: trip_key(name, from_district, to_district, travel_date) for name in providers}
+        left = await asyncio.to_thread(availability, {
+            key: (catalog.provider(name) or {}).get("seats_per_trip", SEATS_PER_TRIP)
+            for name, key in keys.items()
+        })
+        seats_left = {name: left[key] for name, key in keys.items()}
+
+    state.result = _compose_info_message(
+        from_district, to_district, providers, dropping_points, travel_date, seats_left
     )
-
-    providers = _matching_providers(bus_providers, from_district, to_district)
-    state.result = _compose_info_message(from_district, to_district, providers, dropping_points)
     return state
@@ -1,182 +1,191 @@
+import asyncio
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, db, bus_collection
+from app.config import booking_collection
+from app.services import booking_flow
+from app.services.route_catalog import get_catalog
+from app.services.seat_inventory import (
+    SEATS_PER_TRIP,
+    confirm_hold,
+    hold_seats,
+    release_hold,
+    seats_available,
+    trip_key,
+)
+from app.services.slot_extractor import local_today, phone_e164
 from datetime import datetime
 import uuid
 
 
 
 
-def book_ticket(state: ChatState):
+def _reserve_seats(catalog, booking_data, hold, complete):
     """
-    LLM-driven booking process - minimal if/else, maximum LLM intelligence
+    Hold the requested seats while the user confirms, and sell them on
+    completion. Returns (hold, error message); a stale hold is released first.
+    Makes several blocking Mongo round trips, so callers run it in a thread.
+    """
+    provider = booking_data.get("bus_provider")
+    district_from = booking_data.get("district_from")
+    district_to = booking_data.get("district_to")
+    travel_date = booking_data.get("date")
+    try:
+        seats = int(booking_data.get("seats") or 0)
+    except (TypeError, ValueError):
+        seats = 0
+    if not (provider and district_from and district_to and travel_date and seats > 0):
+        return hold, None
+
+    key = trip_key(provider, district_from, district_to, travel_date)
+    if hold and (hold.get("trip_id") != key or hold.get("seats") != seats):
+        release_hold(hold)
+        hold = None
+
+    capacity = (catalog.provider(provider) or {}).get("seats_per_trip", SEATS_PER_TRIP)
+    if hold is None:
+        hold = hold_seats(key, seats, capacity)
+    if hold and complete and not confirm_hold(hold):
+        # The hold was released meanwhile; try to take the seats directly
+        hold = hold_seats(key, seats, capacity)
+        if hold and not confirm_hold(hold):
+            hold = None
+    if hold:
+        return hold, None
+
+    left = seats_available(key, capacity)
+    if left <= 0:
+        return None, (
+            f"Sorry, {provider} from {district_from} to {district_to} on {travel_date} is sold out. "
+            "Would you like another date or provider?"
+        )
+    return None, (
+        f"Only {left} seat(s) are left on {provider} from {district_from} to {district_to} "
+        f"on {travel_date}. How many seats would you like?"
+    )
+
+
+async def book_ticket(state: ChatState):
+    """
+    Code-driven booking: only the delta is extracted from each message; the
+    catalog checks, fare, next question and confirmation are handled by
+    ``booking_flow``.
     """
-    import json
-    
-    thread_id = state.thread_id
     user_message = state.user_message
-    
-    # Fetch dataset from MongoDB
-    dataset = bus_collection.find_one({}, {"districts": 1, "bus_providers": 1})
-    if not dataset:
+
+    # Route catalog is cached in-process and refreshed on version change
+    catalog = await asyncio.to_thread(get_catalog)
+    if not catalog:
         state.result = "Sorry, the booking system is currently unavailable."
         return state
-    
-    districts = dataset.get("districts", [])
-    bus_providers = dataset.get("bus_providers", [])
-    
-    # Fetch chat history
-    chat_doc = chat_collection.find_one(
-        {"thread_id": thread_id},
-        {"chat": 1, "booking_data": 1}
-    )
-    
-    if not chat_doc:
-        state.result = "Sorry, I couldn't find your conversation history."
-        return state
-    
-    chat_history = chat_doc.get("chat", [])
-    existing_booking_data = chat_doc.get("booking_data", {})
-    
-    # Format chat history
-    formatted_history = "\n".join([
-        f"User: {msg.get('user', '')}\nBot: {msg.get('bot', '')}"
-        for msg in chat_history[-15:]
-    ])
-    
-    # Format dataset for LLM
-    dataset_info = {
-        "districts": districts,
-        "bus_providers": bus_providers
-    }
-    
-    # Single LLM call to handle everything
-    main_prompt = f"""
-You are an intelligent booking assistant. Handle the entire booking conversation naturally.
-
-CURRENT DATE: {datetime.utcnow().strftime('%Y-%m-%d')}
-
-AVAILABLE DATA:
-{json.dumps(dataset_info, indent=2)}
-
-CONVERSATION HISTORY:
-{formatted_history}
-
-CURRENT BOOKING DATA (if any):
-{json.dumps(existing_booking_data, indent=2) if existing_booking_data else "No data collected yet"}
-
-USER'S CURRENT MESSAGE:
-{user_message}
-
-YOUR TASK:
-1. Analyze the conversation and current booking data
-2. Extract any new information from the user's message
-3. Validate that pickup_point and dropping_point are from the SAME district's dropping_points
-4. Calculate fare from the dropping_point's price when dropping_point is selected
-5. Determine the next action (ask for info, confirm, or complete booking)
-6. Generate appropriate response
-7. Ask for missing information in a natural way
-
-BOOKING FIELDS NEEDED:
-- district_from: District name (must be from available districts)
-- district_to: District name (must be from available districts)
-- pickup_point: Pickup location (must be from district_from's dropping_points)
-- dropping_point: Dropping location (must be from district_to's dropping_points)
-- bus_provider: Bus provider must be from available for both pickup and dropping district.
-- name: Full name
-- phone: Phone number
-- date: Travel date (YYYY-MM-DD format)
-- seats: Number of seats (integer)
-- fare: Price per seat (auto-calculated from dropping_point)
-
-IMPORTANT RULES:
-- District names like "Dhaka", "Bogra" are NOT pickup/dropping points
-- For pickup points don't show the price
-- Always show price for dropping point
-- pickup_point and dropping_point must be actual location names from the district's list
-- When dropping_point is selected, automatically set fare from its price
-- Only show available bus providers for the selected district
-- Ask for information in a natural, conversational way
-- When user confirms (says yes, confirm, ok, etc.) and all data is complete, proceed to booking
-
-RESPONSE FORMAT (JSON):
-{{
-    "action": "ask_info" | "confirm_booking" | "complete_booking",
-    "updated_booking_data": {{
-        "district_from": "value or null",
-        "district_to": "value or null",
-        "pickup_point": "value or null",
-        "dropping_point": "value or null",
-        "bus_provider": "value or null",
-        "name": "value or null",
-        "phone": "value or null",
-        "date": "YYYY-MM-DD or null",
-        "seats": number or null,
-        "fare": number or null
-    }},
-    "response_to_user": "Your natural conversational response here"
-}}
-
-EXAMPLES OF GOOD RESPONSES:
-- For missing district_from and district_to: "Which district would you like to travel to? We cover Dhaka, Chattogram, Khulna, Rajshahi, Sylhet, Barishal, Rangpur, Mymensingh, Comilla, and Bogra."
-- For missing pickup point: "Great! In Chattogram, we have pickup points at Muradpur, Agrabad, and Kaptai. Which one would you prefer?"
-- For confirmation: "Perfect! Let me confirm your booking: [details]. Shall I proceed with this booking?"
-
-Return ONLY the JSON response, nothing else.
-"""
-    
+
+    # History and booking state were loaded once for this turn
+    context = state.context
+    booking_data = dict(context.get("booking_data", {}) or {})
+    seat_hold = booking_data.pop("seat_hold", None)
+    awaiting = booking_data.pop("awaiting", None)
+
     try:
-        llm_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": main_prompt}],
-            temperature=0.3
-        )
-        
-        # Parse LLM response
-        response_text = llm_response.choices[0].message.content.strip()
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        llm_data = json.loads(response_text)
-        
-        action = llm_data.get("action")
-        updated_booking_data = llm_data.get("updated_booking_data", {})
-        response_to_user = llm_data.get("response_to_user", "")
-        
-        # Handle based on action
-        if action == "complete_booking":
-            # Create booking record
-            booking_id = str(uuid.uuid4())
-            booking_record = {
-                "booking_id": booking_id,
-                "user_id": updated_booking_data.get("user_id"),
-                "name": updated_booking_data.get("name"),
-                "phone": updated_booking_data.get("phone"),
-                "district_from": updated_booking_data.get("district_from"),
-                "district_to": updated_booking_data.get("district_to"),
-                "pickup_point": updated_booking_data.get("pickup_point"),
-                "dropping_point": updated_booking_data.get("dropping_point"),
-                "date": updated_booking_data.get("date"),
-                "seats": updated_booking_data.get("seats"),
-                "bus_provider": updated_booking_data.get("bus_provider"),
-                "fare": updated_booking_data.get("fare"),
-                "total_amount": updated_booking_data.get("fare", 0) * updated_booking_data.get("seats", 0),
-                "pyment_status": "pending",
-                "status": "confirmed",
-                "booked_at": datetime.utcnow()
+        # Local extraction first; fused router slots fill in what it can't see
+        delta = booking_flow.local_delta(catalog, user_message, booking_data, awaiting)
+        if state.slots:
+            fused = {
+                "district_from": state.slots.get("from_district"),
+                "district_to": state.slots.get("to_district"),
+                **{key: state.slots.get(key) for key in booking_flow.BOOKING_FIELDS[2:]},
             }
-            
-            # Save to database
-            db["bookings"].insert_one(booking_record)
-            
-            # Clear booking data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$unset": {"booking_data": ""}}
+            delta = {**{k: v for k, v in fused.items() if v is not None}, **delta}
+
+        confirmed = awaiting == booking_flow.CONFIRM and booking_flow.is_yes(user_message)
+        declined = awaiting == booking_flow.CONFIRM and booking_flow.is_no(user_message)
+        if not (delta or confirmed or declined or state.slots is not None):
+            delta = await booking_flow.extract_delta(
+                catalog,
+                user_message,
+                booking_data,
+                context.history_for(4),
+                local_today().isoformat(),
+            )
+            answer = delta.pop(booking_flow.CONFIRM, None)
+            if awaiting == booking_flow.CONFIRM:
+                confirmed, declined = answer is True, answer is False
+
+        previous = booking_data
+        booking_data, problems = booking_flow.apply_delta(catalog, booking_data, delta)
+        changed = booking_data != previous
+        missing = booking_flow.next_field(booking_data)
+
+        if missing:
+            response = booking_flow.question(catalog, booking_data, missing)
+            awaiting = missing
+        elif confirmed and not changed:
+            seat_hold, seat_error = await asyncio.to_thread(
+                _reserve_seats, catalog, booking_data, seat_hold, True
+            )
+            if not seat_error:
+                state.result = await asyncio.to_thread(_complete_booking, context, booking_data, seat_hold)
+                return state
+            booking_data.pop("seats", None)
+            response, awaiting = seat_error, "seats"
+        elif declined and not changed:
+            response = "No problem. What would you like to change?"
+            awaiting = None
+        else:
+            # Complete (or changed) details: hold the seats while the user confirms
+            seat_hold, seat_error = await asyncio.to_thread(
+                _reserve_seats, catalog, booking_data, seat_hold, False
             )
-            
-            state.result = f"""
+            if seat_error:
+                booking_data.pop("seats", None)
+                response, awaiting = seat_error, "seats"
+            else:
+                response, awaiting = booking_flow.summary(booking_data), booking_flow.CONFIRM
+
+        if problems:
+            response = " ".join(problems) + " " + response
+
+        # Save updated booking data (with the seat hold, if any)
+        if seat_hold:
+            booking_data["seat_hold"] = seat_hold
+        booking_data["awaiting"] = awaiting
+        context.set("booking_data", booking_data)
+        state.result = response
+        return state
+
+    except Exception as e:
+        state.result = f"Sorry, I encountered an error: {str(e)}"
+        return state
+
+
+def _complete_booking(context, booking_data, seat_hold) -> str:
+    """Store the booking with the catalog fare and return the confirmation text."""
+    booking_id = str(uuid.uuid4())
+    booking_record = {
+        "booking_id": booking_id,
+        "user_id": context.user_id,
+        "name": booking_data.get("name"),
+        "phone": booking_data.get("phone"),
+        "phone_e164": phone_e164(booking_data.get("phone")),
+        "district_from": booking_data.get("district_from"),
+        "district_to": booking_data.get("district_to"),
+        "pickup_point": booking_data.get("pickup_point"),
+        "dropping_point": booking_data.get("dropping_point"),
+        "date": booking_data.get("date"),
+        "seats": booking_data.get("seats"),
+        "bus_provider": booking_data.get("bus_provider"),
+        "fare": booking_data.get("fare"),
+        "trip_id": seat_hold["trip_id"] if seat_hold else None,
+        "total_amount": booking_flow.total_amount(booking_data),
+        "pyment_status": "pending",
+        "status": "confirmed",
+        "booked_at": datetime.utcnow()
+    }
+
+    # Save to database
+    booking_collection.insert_one(booking_record)
+
+    # Clear booking data
+    context.unset("booking_data")
+
+    return f"""
 ✅ Booking Confirmed!
 
 🎫 Booking ID: {booking_id}
@@ -195,18 +204,3 @@ Return ONLY the JSON response, nothing else.
 
 Your ticket has been successfully booked! 🎉
 """
-        
-        else:
-            # Save updated booking data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$set": {"booking_data": updated_booking_data}}
-            )
-            
-            state.result = response_to_user
-        
-        return state
-    
-    except Exception as e:
-        state.result = f"Sorry, I encountered an error: {str(e)}"
-        return state
@@ -1,34 +1,31 @@
+import asyncio
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, db
+from app.config import booking_collection
+from app.services.slot_extractor import extract_slots, local_today, slot_values
+from app.services.llm import complete
+from app.services.prompts import CANCEL_TICKET_FIELDS
+from app.services.seat_inventory import release_seats
+from app.utils.bookings import phone_query
 from datetime import datetime
 
 
 
 
-def cancel_ticket(state: ChatState):
+async def cancel_ticket(state: ChatState):
     """
     Cancel a ticket using phone number and booking ID or date
     """
-    thread_id = state.thread_id
     user_message = state.user_message.lower()
     
-    # Fetch chat history
-    chat_doc = chat_collection.find_one(
-        {"thread_id": thread_id},
-        {"chat": 1, "cancel_data": 1}
-    )
-    
-    if not chat_doc:
-        state.result = "Sorry, I couldn't find your conversation history."
-        return state
-    
-    chat_history = chat_doc.get("chat", [])
-    cancel_data = chat_doc.get("cancel_data", {})
+    # History and cancellation state were loaded once for this turn
+    context = state.context
+    chat_history = context.history_for(10)
+    cancel_data = dict(context.get("cancel_data", {}))
     
     # Format chat history for LLM
     formatted_history = "\n".join([
         f"User: {msg.get('user', '')}\nBot: {msg.get('bot', '')}"
-        for msg in chat_history[-10:]
+        for msg in chat_history
     ])
     
     # Check if user is confirming cancellation
@@ -39,23 +36,26 @@ def cancel_ticket(state: ChatState):
     if cancel_data.get("awaiting_confirmation") and is_confirming:
         booking_id = cancel_data.get("booking_id")
         
-        # Update booking status to cancelled
-        result = db["bookings"].update_one(
-            {"booking_id": booking_id},
+        # Update booking status to cancelled (only once, so seats are returned once)
+        cancelled = await asyncio.to_thread(
+            booking_collection.find_one_and_update,
+            {"booking_id": booking_id, "status": "confirmed"},
             {
                 "$set": {
                     "status": "cancelled",
                     "cancelled_at": datetime.utcnow()
                 }
-            }
+            },
+            projection={"trip_id": 1, "seats": 1}
         )
         
-        if result.modified_count > 0:
+        if cancelled:
+            # Give the seats back to the trip inventory
+            if cancelled.get("trip_id") and cancelled.get("seats"):
+                await asyncio.to_thread(release_seats, cancelled["trip_id"], int(cancelled["seats"]))
+            
             # Clear cancel_data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$unset": {"cancel_data": ""}}
-            )
+            context.unset("cancel_data")
             
             state.result = f"""
 ✅ Ticket Cancelled Successfully!
@@ -71,59 +71,43 @@ Your ticket has been cancelled. If you paid online, the refund will be processed
             state.result = "Failed to cancel the ticket. Please try again or contact support."
             return state
     
-    # Extract cancellation information using LLM
-    extraction_prompt = f"""
-You are a ticket cancellation assistant. Extract the phone number and booking identifier from the conversation.
-
-CHAT HISTORY:
-{formatted_history}
-
-CURRENT USER MESSAGE:
-{user_message}
-
-EXISTING CANCEL DATA (if any):
-{cancel_data}
-
-Extract the following information:
-- phone: Phone number
-- booking_id: Booking ID (if provided)
-- date: Travel date (if provided as identifier, format: YYYY-MM-DD)
-
-RULES:
-1. Booking ID takes priority over date for identification
-2. Only extract clearly stated information
-3. Use existing data if not provided again
-4. Today's date is {datetime.utcnow().strftime('%Y-%m-%d')}
-
-Return ONLY a JSON object:
-{{
-    "phone": "value or null",
-    "booking_id": "value or null",
-    "date": "YYYY-MM-DD or null"
-}}
-"""
-    
     try:
         import json
-        extraction_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": extraction_prompt}],
-            temperature=0
-        )
-        
-        extracted_text = extraction_response.choices[0].message.content.strip()
-        if "```json" in extracted_text:
-            extracted_text = extracted_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in extracted_text:
-            extracted_text = extracted_text.split("```")[1].split("```")[0].strip()
-        
-        extracted_data = json.loads(extracted_text)
+        # Local extraction first; the LLM is only asked when nothing is found
+        extracted_data = slot_values(extract_slots(user_message))
+        extracted_data.pop("seats", None)
+        if not extracted_data and state.slots is not None:
+            extracted_data = {key: state.slots.get(key) for key in ("phone", "booking_id", "date")}
+        elif not extracted_data:
+            extraction_response = await complete(
+                model="gpt-4o-mini",
+                messages=CANCEL_TICKET_FIELDS.messages(
+                    today=local_today().isoformat(),
+                    history=formatted_history,
+                    cancel_data=cancel_data,
+                    message=user_message,
+                ),
+                temperature=0,
+                label="cancel_ticket.extract"
+            )
+            
+            extracted_text = extraction_response.choices[0].message.content.strip()
+            if "```json" in extracted_text:
+                extracted_text = extracted_text.split("```json")[1].split("```")[0].strip()
+            elif "```" in extracted_text:
+                extracted_text = extracted_text.split("```")[1].split("```")[0].strip()
+            
+            extracted_data = json.loads(extracted_text)
         
         # Merge with existing data
         for key, value in extracted_data.items():
             if value is not None:
                 cancel_data[key] = value
         
+        # Reuse the phone number given earlier for viewing tickets
+        if not cancel_data.get("phone") and context.get("view_ticket_phone"):
+            cancel_data["phone"] = context.get("view_ticket_phone")
+        
         # Check if we have enough information
         if not cancel_data.get("phone"):
             state.result = """
@@ -134,16 +118,26 @@ Please provide:
 """
             return state
         
+        phone_filter = phone_query(cancel_data["phone"])
+        if phone_filter is None:
+            state.result = f"""
+{cancel_data.pop('phone')} doesn't look like a Bangladeshi mobile number.
+
+Please provide:
+📞 Your phone number (e.g., 01712345678)
+"""
+            context.set("cancel_data", cancel_data)
+            return state
+        
         if not cancel_data.get("booking_id") and not cancel_data.get("date"):
             # Show user's tickets to help them choose
             phone = cancel_data.get("phone")
-            bookings = list(db["bookings"].find(
-                {
-                    "phone": {"$regex": phone.replace("+", "\\+"), "$options": "i"},
-                    "status": "confirmed"
-                },
-                {"_id": 0}
-            ).sort("booked_at", -1))
+            bookings = await asyncio.to_thread(
+                lambda: list(booking_collection.find(
+                    {**phone_filter, "status": "confirmed"},
+                    {"_id": 0}
+                ).sort("booked_at", -1))
+            )
             
             if not bookings:
                 state.result = f"""
@@ -170,10 +164,7 @@ Please check if:
             tickets_display = "\n".join(ticket_list)
             
             # Store phone for next interaction
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$set": {"cancel_data": cancel_data}}
-            )
+            context.set("cancel_data", cancel_data)
             
             state.result = f"""
 📱 Active tickets for {phone}:
@@ -187,7 +178,7 @@ Please provide either:
             return state
         
         # Find the booking
-        query = {"phone": {"$regex": cancel_data["phone"].replace("+", "\\+"), "$options": "i"}}
+        query = dict(phone_filter)
         
         if cancel_data.get("booking_id"):
             query["booking_id"] = cancel_data["booking_id"]
@@ -196,7 +187,7 @@ Please provide either:
         
         query["status"] = "confirmed"  # Only cancel confirmed tickets
         
-        booking = db["bookings"].find_one(query, {"_id": 0})
+        booking = await asyncio.to_thread(booking_collection.find_one, query, {"_id": 0})
         
         if not booking:
             state.result = """
@@ -210,20 +201,14 @@ Possible reasons:
 Please verify your information and try again.
 """
             # Clear cancel data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$unset": {"cancel_data": ""}}
-            )
+            context.unset("cancel_data")
             return state
         
         # Ask for confirmation
         cancel_data["booking_id"] = booking.get("booking_id")
         cancel_data["awaiting_confirmation"] = True
         
-        chat_collection.update_one(
-            {"thread_id": thread_id},
-            {"$set": {"cancel_data": cancel_data}}
-        )
+        context.set("cancel_data", cancel_data)
         
         state.result = f"""
 ⚠️ Confirm Ticket Cancellation
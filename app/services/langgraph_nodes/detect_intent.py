@@ -1,39 +1,54 @@
-from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection
-
-
-def detect_intent(state: ChatState):
-    chat = chat_collection.find_one({"thread_id": state.thread_id}, {"chat": {"$slice": -10}})
-
-    prompt = f"""
-You are a bus ticket booking assistant.
-
-You are given the user's last 10 messages and the assistant's replies:
-CHAT_HISTORY:
-{chat}
-
-Your job:
-1. Read the full chat history and identify what the user is currently trying to do.
-2. Use the latest user message to determine the intent in context.
+import asyncio
 
-INTENT RULES (choose EXACTLY ONE):
-- general_chat       → greetings (hi, hello), gratitude (thank you), casual chat, off-topic questions
-- ask_for_info       → user asks about routes, dropping points, fare, timing, seat availability
-- provider_info      → user asks about bus company details
-- book_ticket        → user is trying to book/confirm a ticket
-- view_ticket        → user wants to see previously booked tickets
-- cancel_ticket      → user wants to cancel a ticket
-
-LATEST USER MESSAGE:
-{state.user_message}
-
-Output:
-Return ONLY the intent name, nothing else.
-"""
-
-    resp = client.chat.completions.create(
+from app.schemas.chat_schema import ChatState
+from app.services.fused_router import FUSED_ROUTER_ENABLED, route_and_extract
+from app.services.intent_classifier import classify_intent
+from app.services.llm import complete
+from app.services.prompts import DETECT_INTENT, format_history
+from app.services.route_catalog import get_catalog
+from app.services.slot_extractor import local_today
+
+
+def _in_dialog(context) -> bool:
+    """True when the bot is mid-flow and the next message is likely an answer."""
+    if context.get("booking_data") or context.get("cancel_data"):
+        return True
+    history = context.history_for(1)
+    return bool(history) and "?" in (history[-1].get("bot") or "")
+
+
+async def detect_intent(state: ChatState):
+    context = state.context
+
+    # Fast path: local rules / model, LLM only when not confident
+    catalog = await asyncio.to_thread(get_catalog)
+    prediction = classify_intent(
+        state.user_message,
+        provider_names=catalog.coverage.provider_names if catalog else (),
+        in_dialog=_in_dialog(context),
+    )
+    if prediction:
+        state.intent = prediction.intent
+        return state
+
+    # Fused mode: intent and slots in one structured call, nodes skip extraction
+    if FUSED_ROUTER_ENABLED:
+        state.intent, state.slots = await route_and_extract(
+            state.user_message,
+            context.history_for(10),
+            today=local_today().isoformat(),
+            district_names=catalog.district_names if catalog else (),
+            provider_names=catalog.coverage.provider_names if catalog else (),
+            booking_data=context.get("booking_data"),
+        )
+        return state
+
+    resp = await complete(
         model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
+        messages=DETECT_INTENT.messages(
+            history=format_history(context.history_for(10)), message=state.user_message
+        ),
+        label="detect_intent"
     )
     state.intent = resp.choices[0].message.content.strip()
-    return state
\ No newline at end of file
+    return state
@@ -1,27 +1,20 @@
 from app.schemas.chat_schema import ChatState
-from app.config import client
+from app.services.llm import stream_chat
+from app.services.prompts import GENERAL_CHAT
+from app.services.response_cache import ResponseCache
 
-def general_chat(state: ChatState):
-    """Handles general conversation, greetings, and thank you messages"""
-    
-    prompt = f"""
-You are a friendly bus ticket booking assistant.
-
-User said: {state.user_message}
+# Replies depend only on the message text, so exact repeats are served locally
+reply_cache = ResponseCache()
 
-Respond naturally and warmly. If they:
-- Greet you → greet back and briefly mention you can help with bus bookings
-- Thank you → acknowledge politely
-- Ask what you do → explain you help with bus ticket booking, viewing, and cancellation
-- Off-topic → politely redirect to bus booking services
-
-Keep it brief and friendly.
-"""
+async def general_chat(state: ChatState):
+    """Handles general conversation, greetings, and thank you messages"""
+    cached = reply_cache.get(state.user_message)
+    if cached:
+        state.result = cached
+        return state
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
+    reply = await stream_chat(GENERAL_CHAT.messages(message=state.user_message), label="general_chat")
     
-    state.result = resp.choices[0].message.content.strip()
+    state.result = reply.strip()
+    reply_cache.put(state.user_message, state.result)
     return state
\ No newline at end of file
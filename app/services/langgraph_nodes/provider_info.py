@@ -1,50 +1,55 @@
+import asyncio
+import os
+import time
 from app.schemas.chat_schema import ChatState
-from app.config import client
-from app.services.load_to_pinecone import get_index
+from app.services.llm import embed as llm_embed, stream_chat
+from app.services.metrics import observe_vector_query
+from app.services.prompts import PROVIDER_INFO
+from app.services.response_cache import ResponseCache
+from app.services.vector_store import get_vector_store
 
-index = get_index()
+# Number of document chunks placed in the prompt
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
 
-def embed(text: str):
-    res = client.embeddings.create(
-        model="text-embedding-3-large",
-        input=text
-    )
+# Answers are reused until any provider document in data/ changes
+answer_cache = ResponseCache(source_dir="data")
+
+async def embed(text: str):
+    res = await llm_embed(text, model="text-embedding-3-large", label="provider_info.embed")
     return res.data[0].embedding
 
-def provider_info(state: ChatState):
+async def provider_info(state: ChatState):
     query = state.user_message
 
+    cached = answer_cache.get(query)
+    if cached:
+        state.result = cached
+        return state
+
     try:
-        vector = embed(query)
-        results = index.query(vector=vector, top_k=1, include_metadata=True)
+        vector = await embed(query)
+        cached = answer_cache.get_similar(vector)
+        if cached:
+            state.result = cached
+            return state
+
+        # Store is created on first use, not at import
+        store = await asyncio.to_thread(get_vector_store)
+        started = time.perf_counter()
+        matches = await asyncio.to_thread(store.query, vector, top_k=RETRIEVAL_TOP_K)
+        observe_vector_query(time.perf_counter() - started)
 
-        if not results["matches"]:
+        if not matches:
             state.result = "No relevant information found for this provider."
             return state
 
-        text_blocks = [m["metadata"].get("text", "") for m in results["matches"]]
+        text_blocks = [m["metadata"].get("text", "") for m in matches]
         context_str = "\n\n".join(text_blocks)
 
-        prompt = f"""
-Use the following context to answer the user query.
-
-Context:
-{context_str}
-
-User Query:
-{query}
-
-Answer:
-"""
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Answer based only on the provided context."},
-                {"role": "user", "content": prompt}
-            ]
+        state.result = await stream_chat(
+            PROVIDER_INFO.messages(context=context_str, query=query), label="provider_info"
         )
-
-        state.result = completion.choices[0].message.content
+        answer_cache.put(query, state.result, vector)
         return state
 
     except Exception as e:
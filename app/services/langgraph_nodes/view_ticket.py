@@ -1,87 +1,77 @@
+import asyncio
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, db
+from app.config import booking_collection
+from app.services.llm import complete
+from app.services.prompts import VIEW_TICKET_PHONE
+from app.services.slot_extractor import extract_slots
+from app.utils.bookings import phone_query
 
 
 
 
-def view_ticket(state: ChatState):
+async def view_ticket(state: ChatState):
     """
     View user's booked tickets by phone number
     """
-    thread_id = state.thread_id
     user_message = state.user_message
     
-    # Fetch chat history
-    chat_doc = chat_collection.find_one(
-        {"thread_id": thread_id},
-        {"chat": 1, "view_ticket_phone": 1}
-    )
-    
-    if not chat_doc:
-        state.result = "Sorry, I couldn't find your conversation history."
-        return state
-    
-    chat_history = chat_doc.get("chat", [])
-    stored_phone = chat_doc.get("view_ticket_phone")
+    # History and stored phone were loaded once for this turn
+    context = state.context
+    chat_history = context.history_for(10)
+    stored_phone = context.get("view_ticket_phone")
     
     # Format chat history for LLM
     formatted_history = "\n".join([
         f"User: {msg.get('user', '')}\nBot: {msg.get('bot', '')}"
-        for msg in chat_history[-10:]
+        for msg in chat_history
     ])
     
-    # Extract phone number using LLM
-    extraction_prompt = f"""
-You are a ticket viewing assistant. Extract the phone number from the conversation.
-
-CHAT HISTORY:
-{formatted_history}
-
-CURRENT USER MESSAGE:
-{user_message}
-
-STORED PHONE (if any):
-{stored_phone}
-
-Extract the phone number that the user wants to check tickets for.
-Return ONLY the phone number, nothing else. If no phone number is found, return "NOT_FOUND".
-
-Examples:
-- "show my tickets" → extract from chat history or stored phone
-- "my number is +8801712345678" → +8801712345678
-- "01712345678" → 01712345678
-- "check tickets for 01812345678" → 01812345678
-"""
-    
     try:
-        extraction_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": extraction_prompt}],
-            temperature=0
-        )
-        
-        phone = extraction_response.choices[0].message.content.strip()
+        # Local extraction first; the LLM only resolves references to earlier turns
+        slots = extract_slots(user_message)
+        if "phone" in slots:
+            phone = slots["phone"].value
+        elif state.slots is not None:
+            # The fused router already looked at the history
+            phone = state.slots.get("phone") or stored_phone or "NOT_FOUND"
+        else:
+            extraction_response = await complete(
+                model="gpt-4o-mini",
+                messages=VIEW_TICKET_PHONE.messages(
+                    history=formatted_history, stored_phone=stored_phone, message=user_message
+                ),
+                temperature=0,
+                label="view_ticket.extract"
+            )
+            
+            phone = extraction_response.choices[0].message.content.strip()
         
         if phone == "NOT_FOUND" or not phone:
             state.result = """
 I need your phone number to retrieve your tickets.
 
+Please provide the phone number you used when booking.
+Example: 01712345678 or +8801712345678
+"""
+            return state
+        
+        query = phone_query(phone)
+        if query is None:
+            state.result = f"""
+{phone} doesn't look like a Bangladeshi mobile number.
+
 Please provide the phone number you used when booking.
 Example: 01712345678 or +8801712345678
 """
             return state
         
         # Store phone for future reference
-        chat_collection.update_one(
-            {"thread_id": thread_id},
-            {"$set": {"view_ticket_phone": phone}}
-        )
+        context.set("view_ticket_phone", phone)
         
         # Search for bookings with this phone number
-        bookings = list(db["bookings"].find(
-            {"phone": {"$regex": phone.replace("+", "\\+"), "$options": "i"}},
-            {"_id": 0}
-        ).sort("booked_at", -1))
+        bookings = await asyncio.to_thread(
+            lambda: list(booking_collection.find(query, {"_id": 0}).sort("booked_at", -1))
+        )
         
         if not bookings:
             state.result = f"""
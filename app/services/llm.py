@@ -0,0 +1,328 @@
+"""
+LLM gateway: every OpenAI call from the chat graph goes through here.
+
+- Concurrency: one global semaphore (``LLM_MAX_CONCURRENCY``) plus one per
+  model (``LLM_MODEL_CONCURRENCY``, e.g. ``gpt-4o-mini=24,text-embedding-3-large=8``).
+  Calls over the limit wait in line; ``gateway.stats()`` reports the queue
+  and in-flight counts.
+- Retries: 429, 5xx, timeouts and connection errors are retried up to
+  ``LLM_MAX_RETRIES`` times with full-jitter exponential backoff. A
+  ``Retry-After`` header is honoured.
+- Timeouts: each attempt is bounded by ``LLM_TIMEOUT`` seconds unless the
+  caller passes ``timeout``.
+- Circuit breaker: after ``LLM_BREAKER_FAILURES`` consecutive failures a model
+  fails fast with ``CircuitOpenError`` for ``LLM_BREAKER_COOLDOWN`` seconds.
+  After that one trial call decides whether the circuit closes again.
+
+``complete`` and ``embed`` return the SDK response. ``stream_chat`` also
+forwards tokens to the LangGraph stream writer, which ``/chat/stream`` reads
+from the "custom" stream mode; a plain ``flow.ainvoke`` ignores them.
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import openai
+from langgraph.config import get_stream_writer
+
+from app.config import LLM_MAX_RETRIES, LLM_TIMEOUT, client
+from app.services.metrics import observe_llm
+from app.services.token_usage import record_usage
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+
+def _model_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, value = item.partition("=")
+        limits[model.strip()] = int(value)
+    return limits
+
+
+LLM_MODEL_CONCURRENCY = _model_limits(os.getenv("LLM_MODEL_CONCURRENCY", ""))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the API while a model's circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial:
+            self._trial = True  # let exactly one call probe the upstream
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.max_failures:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+    def release(self):
+        """End a call with no verdict (it was cancelled); frees the trial slot."""
+        self._trial = False
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_retries: int = LLM_MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._global: Optional[asyncio.Semaphore] = None
+        self._models: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.counts = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+        self._per_model: Dict[str, Dict[str, int]] = {}
+
+    def _semaphores(self, model: str):
+        # Created on first use so they bind to the running event loop
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        if model not in self._models:
+            self._models[model] = asyncio.Semaphore(LLM_MODEL_CONCURRENCY.get(model, self.max_concurrency))
+        return self._global, self._models[model]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        return self._breakers.setdefault(model, CircuitBreaker())
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        """Wait for a global and a per-model slot; counts queue depth and in-flight calls."""
+        global_limit, model_limit = self._semaphores(model)
+        per_model = self._per_model.setdefault(model, {"queued": 0, "in_flight": 0})
+        self.queued += 1
+        per_model["queued"] += 1
+        try:
+            await global_limit.acquire()
+            try:
+                await model_limit.acquire()
+            except BaseException:
+                global_limit.release()
+                raise
+        finally:
+            self.queued -= 1
+            per_model["queued"] -= 1
+        self.in_flight += 1
+        per_model["in_flight"] += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            per_model["in_flight"] -= 1
+            model_limit.release()
+            global_limit.release()
+
+    def _check_breaker(self, model: str):
+        if not self.breaker(model).allow():
+            self.counts["rejected"] += 1
+            raise CircuitOpenError(f"{model} is unavailable (circuit open); try again shortly")
+
+    def _backoff(self, model: str, error: Exception, attempt: int) -> float:
+        """Record a failed attempt; return the delay before the next one or re-raise."""
+        retryable = _is_retryable(error)
+        if retryable:
+            self.breaker(model).failure()
+        else:  # the upstream answered; a bad request says nothing about its health
+            self.breaker(model).success()
+        if not retryable or attempt >= self.max_retries:
+            self.counts["failures"] += 1
+            raise error
+        self.counts["retries"] += 1
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        return max(delay, _retry_after(error) or 0.0)
+
+    async def call(self, model: str, request: Callable[[float], Awaitable[Any]], timeout: Optional[float] = None):
+        """Run ``request(timeout)`` under the limits, retry policy and breaker."""
+        self.counts["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker(model)
+            async with self.slot(model):
+                try:
+                    result = await request(timeout or LLM_TIMEOUT)
+                except Exception as e:
+                    delay = self._backoff(model, e, attempt)
+                except BaseException:
+                    self.breaker(model).release()
+                    raise
+                else:
+                    self.breaker(model).success()
+                    return result
+            await asyncio.sleep(delay)
+
+    async def stream(self, model: str, request: Callable[[float], Awaitable[Any]], timeout: Optional[float] = None):
+        """
+        Like ``call`` for streamed responses: yields chunks and keeps the slot
+        until the stream ends. Only opening the stream is retried; a failure
+        mid-stream still counts against the breaker.
+        """
+        self.counts["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker(model)
+            async with self.slot(model):
+                stream = None
+                try:
+                    stream = await request(timeout or LLM_TIMEOUT)
+                    async for chunk in stream:
+                        yield chunk
+                except Exception as e:
+                    if stream is not None:  # tokens already went out, so never retried
+                        self._backoff(model, e, self.max_retries)
+                    delay = self._backoff(model, e, attempt)
+                except BaseException:  # cancelled, or the consumer stopped reading
+                    self.breaker(model).release()
+                    raise
+                else:
+                    self.breaker(model).success()
+                    return
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            **self.counts,
+            "models": {
+                model: {**counts, "circuit": self.breaker(model).state}
+                for model, counts in self._per_model.items()
+            },
+        }
+
+
+gateway = LLMGateway()
+
+
+async def complete(
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o-mini",
+    label: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+):
+    """Chat completion through the gateway; usage is recorded under ``label``."""
+    start = time.perf_counter()
+    resp = await gateway.call(
+        model,
+        lambda t: client.chat.completions.create(model=model, messages=messages, timeout=t, **kwargs),
+        timeout,
+    )
+    observe_llm(model, label, time.perf_counter() - start, resp.usage)
+    if label:
+        record_usage(label, resp.usage)
+    return resp
+
+
+async def embed(
+    input: Any,
+    model: str = "text-embedding-3-large",
+    label: Optional[str] = None,
+    timeout: Optional[float] = None,
+):
+    """Embeddings through the gateway; usage is recorded under ``label``."""
+    start = time.perf_counter()
+    resp = await gateway.call(
+        model,
+        lambda t: client.embeddings.create(model=model, input=input, timeout=t),
+        timeout,
+    )
+    observe_llm(model, label, time.perf_counter() - start, resp.usage)
+    if label:
+        record_usage(label, resp.usage)
+    return resp
+
+
+def _writer() -> Callable[[Any], None]:
+    try:
+        return get_stream_writer()
+    except RuntimeError:  # called outside a graph run (scripts, benchmarks)
+        return lambda chunk: None
+
+
+async def stream_chat(
+    messages: List[Dict[str, Any]],
+    model: str = "gpt-4o-mini",
+    label: str = "chat",
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> str:
+    """
+    Run a chat completion with ``stream=True`` and return the full text.
+
+    Tokens go to the graph's stream writer as they arrive. Token usage is
+    recorded under ``label``.
+    """
+    write = _writer()
+    parts: List[str] = []
+    usage = None
+    start = time.perf_counter()
+
+    chunks = gateway.stream(
+        model,
+        lambda t: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=t,
+            **kwargs,
+        ),
+        timeout,
+    )
+    async for chunk in chunks:
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+            record_usage(label, usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        write({"token": delta})
+    observe_llm(model, label, time.perf_counter() - start, usage)
+    return "".join(parts)
@@ -1,21 +1,32 @@
 import os
+import re
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
+from app.config import sync_client
+from app.services.embedding_cache import EmbeddingCache, text_digest
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("PINECONE_INDEX")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "400"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "80"))
+UPSERT_BATCH = 100
 
 
 # ---------- Create Pinecone index if missing ---------- #
 def init_index():
+    # Pinecone is optional; only needed with VECTOR_BACKEND=pinecone
+    from pinecone import Pinecone, ServerlessSpec
+
+    pc = Pinecone(api_key=PINECONE_API_KEY)
     if INDEX_NAME not in pc.list_indexes().names():
         pc.create_index(
             name=INDEX_NAME,
@@ -29,12 +40,40 @@ def get_index():
     return init_index()
 
 # ---------- Helper: embed text ---------- #
-def embed_text(text: str):
-    response = client.embeddings.create(
-        model="text-embedding-3-large",
-        input=text
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    response = sync_client.embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=texts
     )
-    return response.data[0].embedding
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed many texts, reusing cached vectors and sending the rest in batches
+    of EMBED_BATCH_SIZE with at most EMBED_MAX_WORKERS requests in flight.
+    """
+    cache = EmbeddingCache()
+    digests = [text_digest(t) for t in texts]
+    vectors = cache.get_many(EMBEDDING_MODEL, digests)
+
+    # Embed each distinct uncached text once
+    pending = {}
+    for digest, text in zip(digests, texts):
+        if digest not in vectors:
+            pending.setdefault(digest, text)
+
+    if pending:
+        keys = list(pending)
+        batches = [keys[i:i + EMBED_BATCH_SIZE] for i in range(0, len(keys), EMBED_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=EMBED_MAX_WORKERS) as pool:
+            results = pool.map(lambda batch: _embed_batch([pending[k] for k in batch]), batches)
+            fresh = [(k, v) for batch, embs in zip(batches, results) for k, v in zip(batch, embs)]
+        cache.put_many(EMBEDDING_MODEL, fresh)
+        vectors.update(fresh)
+        print(f"Embedded {len(keys)} texts in {len(batches)} API calls ({len(texts) - len(keys)} cached).")
+
+    return [vectors[d] for d in digests]
 
 
 # ---------- Load all .txt files ---------- #
@@ -53,43 +92,111 @@ def load_files(folder="data"):
     return docs
 
 
-# ---------- Main function: upload only missing embeddings ---------- #
-def upload_embeddings_if_missing():
-    index = init_index()
+# ---------- Split documents into overlapping chunks ---------- #
+def _split_long(paragraph: str, size: int) -> List[str]:
+    sentences = re.split(r"(?<=[.!?])\s+", paragraph)
+    pieces: List[str] = []
+    for sentence in sentences:
+        while len(sentence) > size:
+            pieces.append(sentence[:size])
+            sentence = sentence[size:]
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Pack paragraphs (then sentences) into chunks of at most ~size characters.
+    Each chunk after the first starts with the last ~overlap characters of the
+    previous one, cut at a word boundary.
+    """
+    units: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            units.extend([paragraph] if len(paragraph) <= size else _split_long(paragraph, size))
+
+    chunks: List[str] = []
+    current = ""
+    for unit in units:
+        if current and len(current) + len(unit) + 2 > size:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ""
+            tail = tail[tail.find(" ") + 1:] if " " in tail else tail
+            current = f"{tail}\n\n{unit}" if tail else unit
+        else:
+            current = f"{current}\n\n{unit}" if current else unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_chunks(docs) -> List[dict]:
+    """
+    Chunk every document; ids are content-addressed (source#hash).
+
+    Each chunk is prefixed with the document title so a chunk such as
+    "Contact Information: ..." still says which provider it belongs to.
+    """
+    chunks = []
+    for doc in docs:
+        title = next((line.strip() for line in doc["text"].splitlines() if line.strip()), doc["id"])
+        seen = set()
+        for position, text in enumerate(chunk_text(doc["text"])):
+            if not text.startswith(title):
+                text = f"{title}\n\n{text}"
+            digest = text_digest(text)
+            if digest in seen:
+                continue
+            seen.add(digest)
+            chunks.append({
+                "id": f"{doc['id']}#{digest[:16]}",
+                "text": text,
+                "metadata": {
+                    "source": doc["id"],
+                    "chunk": position,
+                    "hash": digest,
+                    "text": text,
+                },
+            })
+    return chunks
+
 
-    docs = load_files()
-    all_ids = [doc["id"] for doc in docs]
+# ---------- Main function: incremental, chunk-level sync ---------- #
+def sync_embeddings():
+    """
+    Bring the vector store in line with data/: embed and upsert only chunks
+    whose content hash is new, and delete chunks (or whole documents) that no
+    longer exist.
+    """
+    from app.services.vector_store import get_vector_store
 
-    # Fetch which IDs already exist
-    # (Pinecone only supports describe in batches)
-    existing = set()
+    store = get_vector_store()
 
-    # Batch check (safe for large sets)
-    BATCH = 100
-    for i in range(0, len(all_ids), BATCH):
-        batch = all_ids[i:i+BATCH]
-        res = index.fetch(batch)
-        existing.update(res.vectors.keys())
+    chunks = build_chunks(load_files())
+    wanted = {c["id"] for c in chunks}
+    existing = store.list_ids()
 
-    to_upload = [d for d in docs if d["id"] not in existing]
+    to_upload = [c for c in chunks if c["id"] not in existing]
+    stale = existing - wanted
 
-    if not to_upload:
-        print("Embeddings already exist. No upload needed.")
+    if not to_upload and not stale:
+        print("Embeddings are up to date. No upload needed.")
         return
 
-    print(f"{len(to_upload)} new files found. Uploading...")
-
-    vectors = []
-    for doc in to_upload:
-        emb = embed_text(doc["text"])
-        vectors.append({
-            "id": doc["id"],
-            "values": emb,
-            "metadata": {
-                "source": doc["id"],
-                "text": doc["text"]
-            }
-        })
-
-    index.upsert(vectors)
+    if to_upload:
+        print(f"{len(to_upload)} new or changed chunks found. Uploading...")
+        embeddings = embed_texts([c["text"] for c in to_upload])
+        vectors = [
+            {"id": c["id"], "values": emb, "metadata": c["metadata"]}
+            for c, emb in zip(to_upload, embeddings)
+        ]
+        for i in range(0, len(vectors), UPSERT_BATCH):
+            store.upsert(vectors[i:i + UPSERT_BATCH])
+
+    if stale:
+        print(f"Removing {len(stale)} stale chunks.")
+        store.delete(stale)
+
     print("Upload completed.")
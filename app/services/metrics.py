@@ -0,0 +1,143 @@
+"""
+Prometheus metrics, served at ``GET /metrics``.
+
+- ``graph_node_seconds{node,intent}`` and ``graph_node_errors_total{node,intent}``
+  for every LangGraph node (``instrument_node``).
+- ``llm_call_seconds{model,label}`` and ``llm_tokens_total{model,label,kind}``
+  (kind is prompt, cached or completion) for every chat and embedding call
+  made through ``app.services.llm``.
+- ``mongo_command_seconds{command,collection}`` and
+  ``mongo_command_errors_total{command,collection}`` from a pymongo command
+  listener (``mongo_listeners``).
+- ``vector_query_seconds`` for vector store queries (local or Pinecone).
+- ``intent_route_total{tier}`` for every routed turn: decided by a local
+  rule, by the local model, or left to the LLM (``intent_classifier``).
+
+Requires the optional ``prometheus_client`` package and is off when it is
+missing or ``METRICS_ENABLED=0``; the helpers then do nothing.
+"""
+import functools
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+try:
+    import prometheus_client
+except ImportError:  # optional dependency
+    prometheus_client = None
+
+METRICS_ENABLED = prometheus_client is not None and os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Upper bounds in seconds: Mongo and node latencies span ~1ms to tens of seconds
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+if METRICS_ENABLED:
+    NODE_SECONDS = prometheus_client.Histogram(
+        "graph_node_seconds", "LangGraph node latency", ["node", "intent"], buckets=_BUCKETS
+    )
+    NODE_ERRORS = prometheus_client.Counter(
+        "graph_node_errors_total", "LangGraph node exceptions", ["node", "intent"]
+    )
+    LLM_SECONDS = prometheus_client.Histogram(
+        "llm_call_seconds", "LLM call latency, retries and queueing included", ["model", "label"], buckets=_BUCKETS
+    )
+    LLM_TOKENS = prometheus_client.Counter(
+        "llm_tokens_total", "LLM tokens by kind (prompt, cached, completion)", ["model", "label", "kind"]
+    )
+    MONGO_SECONDS = prometheus_client.Histogram(
+        "mongo_command_seconds", "MongoDB command latency", ["command", "collection"], buckets=_BUCKETS
+    )
+    MONGO_ERRORS = prometheus_client.Counter(
+        "mongo_command_errors_total", "Failed MongoDB commands", ["command", "collection"]
+    )
+    VECTOR_SECONDS = prometheus_client.Histogram(
+        "vector_query_seconds", "Vector store query latency", buckets=_BUCKETS
+    )
+    INTENT_ROUTES = prometheus_client.Counter(
+        "intent_route_total", "Turns routed by tier (rule, model, llm)", ["tier"]
+    )
+
+
+def instrument_node(name: str, node):
+    """Wrap an async graph node so its latency is recorded by node and intent."""
+    if not METRICS_ENABLED:
+        return node
+
+    @functools.wraps(node)
+    async def wrapper(state):
+        start = time.perf_counter()
+        try:
+            result = await node(state)
+        except Exception:
+            NODE_ERRORS.labels(name, state.intent or "unknown").inc()
+            raise
+        intent = getattr(result, "intent", None) or state.intent or "unknown"
+        NODE_SECONDS.labels(name, intent).observe(time.perf_counter() - start)
+        return result
+
+    return wrapper
+
+
+def observe_llm(model: str, label: Optional[str], seconds: float, usage: Any = None):
+    if not METRICS_ENABLED:
+        return
+    label = label or "unlabelled"
+    LLM_SECONDS.labels(model, label).observe(seconds)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    for kind, value in (
+        ("prompt", getattr(usage, "prompt_tokens", 0)),
+        ("cached", getattr(details, "cached_tokens", 0)),
+        ("completion", getattr(usage, "completion_tokens", 0)),
+    ):
+        if value:
+            LLM_TOKENS.labels(model, label, kind).inc(value)
+
+
+def observe_vector_query(seconds: float):
+    if METRICS_ENABLED:
+        VECTOR_SECONDS.observe(seconds)
+
+
+def observe_intent_route(tier: str):
+    if METRICS_ENABLED:
+        INTENT_ROUTES.labels(tier).inc()
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command; the collection name is only on the started event."""
+
+    def __init__(self):
+        self._started: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._started[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def _finish(self, event) -> Tuple[str, str]:
+        collection = self._started.pop((event.connection_id, event.request_id), "")
+        return event.command_name, collection
+
+    def succeeded(self, event):
+        command, collection = self._finish(event)
+        MONGO_SECONDS.labels(command, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        command, collection = self._finish(event)
+        MONGO_SECONDS.labels(command, collection).observe(event.duration_micros / 1e6)
+        MONGO_ERRORS.labels(command, collection).inc()
+
+
+def mongo_listeners() -> List[monitoring.CommandListener]:
+    """``event_listeners`` for ``MongoClient``; empty when metrics are off."""
+    return [MongoCommandMetrics()] if METRICS_ENABLED else []
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition body and content type for ``/metrics``."""
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
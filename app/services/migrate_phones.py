@@ -0,0 +1,61 @@
+"""
+Backfill ``phone_e164`` on bookings created before phone lookups were indexed.
+
+Usage:
+    python -m app.services.migrate_phones [--batch-size 1000] [--dry-run]
+
+Safe to re-run: only documents without the field are visited. Phones that
+can't be normalized are left without the field and listed by ``_id`` so they
+can be fixed by hand; such bookings can't be looked up by phone.
+"""
+import argparse
+from pymongo import UpdateOne
+from app.config import booking_collection
+from app.services.slot_extractor import phone_e164
+from app.utils.bookings import ensure_booking_indexes
+
+
+def migrate_phones(batch_size: int = 1000, dry_run: bool = False):
+    if not dry_run:
+        ensure_booking_indexes()
+
+    cursor = booking_collection.find(
+        {"phone_e164": {"$exists": False}}, {"_id": 1, "phone": 1}
+    ).batch_size(batch_size)
+
+    updated = 0
+    unparseable = []
+    batch = []
+    for doc in cursor:
+        e164 = phone_e164(doc.get("phone"))
+        if e164 is None:
+            unparseable.append(doc)
+            continue
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"phone_e164": e164}}))
+        if len(batch) >= batch_size:
+            if not dry_run:
+                booking_collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            booking_collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+
+    prefix = "Would update" if dry_run else "Updated"
+    print(f"{prefix} {updated} bookings; skipped {len(unparseable)} with an unrecognized phone number.")
+    for doc in unparseable:
+        print(f"  {doc['_id']}: {doc.get('phone')!r}")
+    return updated, len(unparseable)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    migrate_phones(args.batch_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
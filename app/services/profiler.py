@@ -0,0 +1,151 @@
+"""
+Sampled profiling of chat turns with pyinstrument (optional dependency).
+
+Off by default. It is enabled by ``PROFILE_SAMPLE_RATE`` (share of chat
+requests to keep, e.g. ``0.01``) and/or ``PROFILE_SLOW_SECONDS`` (keep every
+request slower than this). When it is off the middleware is not even
+installed. With a slow threshold every chat request is profiled, because
+slowness is only known at the end. The sampling interval is
+``PROFILE_INTERVAL`` (5ms) to keep that cheap.
+
+The ``PROFILE_KEEP`` slowest kept profiles are held in memory, tagged with
+the thread_id and intent (see ``annotate``). ``/debug/profiles`` lists them
+and ``/debug/profiles/{id}`` dumps one. From a shell:
+
+    python -m app.services.profiler list
+    python -m app.services.profiler dump 3 > turn.txt
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional dependency
+    Profiler = None
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_PATHS = ("/chat", "/chat/stream")
+
+PROFILING_ENABLED = Profiler is not None and (PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_SECONDS > 0)
+
+# A dict, not values: the stream endpoint runs its generator in a child task,
+# which can mutate it but not re-set the variable for the middleware
+_tags: ContextVar[Optional[Dict[str, Any]]] = ContextVar("profile_tags", default=None)
+
+
+def annotate(**tags: Any):
+    """Tag the request being profiled (thread_id, intent); no-op otherwise."""
+    current = _tags.get()
+    if current is not None:
+        current.update(tags)
+
+
+class ProfileStore:
+    """The ``keep`` slowest profiles, rendered on demand."""
+
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self.keep = keep
+        self._heap: List[tuple] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, duration: float, reason: str, tags: Dict[str, Any], session: Any):
+        record = {
+            "id": next(self._ids),
+            "duration_ms": round(duration * 1000, 1),
+            "reason": reason,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **tags,
+        }
+        with self._lock:
+            entry = (duration, record["id"], record, session)
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heappushpop(self._heap, entry)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record for _, _, record, _ in sorted(self._heap, reverse=True)]
+
+    def render(self, profile_id: int, html: bool = False) -> Optional[str]:
+        from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer
+
+        with self._lock:
+            found = next((s for _, i, _, s in self._heap if i == profile_id), None)
+        if found is None:
+            return None
+        renderer = HTMLRenderer() if html else ConsoleRenderer(unicode=True, color=False, show_all=False)
+        return renderer.render(found)
+
+
+profiles = ProfileStore()
+
+
+class ProfilerMiddleware:
+    """ASGI middleware, so streamed responses are profiled until the last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in PROFILE_PATHS:
+            return await self.app(scope, receive, send)
+
+        sampled = random.random() < PROFILE_SAMPLE_RATE
+        if not (sampled or PROFILE_SLOW_SECONDS > 0):
+            return await self.app(scope, receive, send)
+
+        tags: Dict[str, Any] = {"path": scope["path"]}
+        token = _tags.set(tags)
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session = profiler.stop()
+            duration = time.perf_counter() - start
+            _tags.reset(token)
+            slow = PROFILE_SLOW_SECONDS > 0 and duration >= PROFILE_SLOW_SECONDS
+            if sampled or slow:
+                profiles.add(duration, "slow" if slow else "sampled", tags, session)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or dump profiles captured by a running server.")
+    parser.add_argument("command", choices=["list", "dump"])
+    parser.add_argument("id", nargs="?", type=int)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--html", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        with urllib.request.urlopen(f"{args.url}/debug/profiles") as resp:
+            for record in json.load(resp):
+                print(
+                    f"{record['id']:>4} {record['duration_ms']:>9.1f}ms {record['reason']:<7} "
+                    f"{record['at']} {record['path']} thread={record.get('thread_id')} intent={record.get('intent')}"
+                )
+        return
+    if args.id is None:
+        parser.error("dump needs a profile id")
+    suffix = "?format=html" if args.html else ""
+    with urllib.request.urlopen(f"{args.url}/debug/profiles/{args.id}{suffix}") as resp:
+        print(resp.read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+# Components that must be warm before /readyz reports ready.
+REQUIRED_COMPONENTS = ("catalog",)
+
+_components: Dict[str, Dict[str, Any]] = {}
+
+
+def mark_pending(name: str):
+    _components[name] = {"status": "pending", "error": None, "attempts": 0, "ready_at": None}
+
+
+def mark_ready(name: str):
+    entry = _components.setdefault(name, {"attempts": 0})
+    entry.update(status="ready", error=None, ready_at=time.time())
+
+
+def mark_failed(name: str, error: Exception):
+    entry = _components.setdefault(name, {"attempts": 0})
+    entry.update(status="failed", error=str(error), ready_at=None)
+
+
+def is_ready() -> bool:
+    return all(_components.get(n, {}).get("status") == "ready" for n in REQUIRED_COMPONENTS)
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    return {name: dict(entry) for name, entry in _components.items()}
+
+
+async def warm_up(
+    name: str,
+    task: Callable[[], Awaitable[Any]],
+    max_delay: float = 60.0,
+):
+    """
+    Run ``task`` until it succeeds, retrying with exponential backoff, and
+    record the component's state for /readyz.
+    """
+    mark_pending(name)
+    delay = 1.0
+    while True:
+        _components[name]["attempts"] += 1
+        try:
+            await task()
+        except Exception as e:
+            mark_failed(name, e)
+            print(f"Warm-up of {name} failed ({e}); retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        else:
+            mark_ready(name)
+            return
@@ -0,0 +1,161 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.93"))
+
+# How often the source folder is re-scanned for changes (seconds).
+_SOURCE_CHECK_SECONDS = 5.0
+
+
+def normalize_query(text: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _Entry:
+    __slots__ = ("response", "vector", "expires_at")
+
+    def __init__(self, response: str, vector: Optional[np.ndarray], expires_at: float):
+        self.response = response
+        self.vector = vector
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of final answers keyed by normalized query text, with an
+    optional nearest-neighbour lookup on query embeddings.
+
+    When ``source_dir`` is given, the whole cache is dropped as soon as any
+    ``.txt`` file in it is added, removed or modified.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = CACHE_SIZE,
+        ttl: float = CACHE_TTL,
+        similarity: float = CACHE_SIMILARITY,
+        source_dir: Optional[str] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity = similarity
+        self.source_dir = source_dir
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._fingerprint: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+    def _source_fingerprint(self) -> Tuple:
+        try:
+            with os.scandir(self.source_dir) as entries:
+                return tuple(sorted(
+                    (e.name, e.stat().st_mtime_ns, e.stat().st_size)
+                    for e in entries
+                    if e.name.endswith(".txt")
+                ))
+        except OSError:
+            return ()
+
+    def _check_sources(self):
+        if not self.source_dir:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < _SOURCE_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        fingerprint = self._source_fingerprint()
+        if fingerprint != self._fingerprint:
+            if self._fingerprint is not None:
+                self.clear()
+            self._fingerprint = fingerprint
+
+    def _live(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            del self._entries[key]
+            self._matrix = None
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, text: str) -> Optional[str]:
+        """Exact lookup on normalized text."""
+        self._check_sources()
+        entry = self._live(normalize_query(text))
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry.response
+
+    def get_similar(self, vector: Sequence[float]) -> Optional[str]:
+        """Return the cached answer whose query embedding is closest, if similar enough."""
+        self._check_sources()
+        if self._matrix is None:
+            self._build_matrix()
+        if self._matrix is None:
+            return None
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+        scores = self._matrix @ (query / norm)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+
+        entry = self._live(self._matrix_keys[best])
+        if entry is None:
+            return None
+        self.semantic_hits += 1
+        return entry.response
+
+    def _build_matrix(self):
+        keys = [k for k, e in self._entries.items() if e.vector is not None]
+        self._matrix_keys = keys
+        self._matrix = np.stack([self._entries[k].vector for k in keys]) if keys else None
+
+    def put(self, text: str, response: str, vector: Optional[Sequence[float]] = None):
+        """Store a freshly computed answer (each call counts as a cache miss)."""
+        self._check_sources()
+        self.misses += 1
+        normalized_vector = None
+        if vector is not None:
+            normalized_vector = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(normalized_vector)
+            normalized_vector = normalized_vector / norm if norm else None
+
+        key = normalize_query(text)
+        self._entries[key] = _Entry(response, normalized_vector, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+    def clear(self):
+        self._entries.clear()
+        self._matrix = None
+        self._matrix_keys = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
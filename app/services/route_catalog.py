@@ -0,0 +1,104 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import bus_collection
+from app.services.coverage_index import CoverageIndex
+
+CATALOG_ID = "startup_data"
+
+# How often a worker checks the catalog version in MongoDB (seconds).
+REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+
+
+class RouteCatalog:
+    """
+    In-memory, indexed view of the ``startup_data`` document.
+
+    Lookups by district, dropping point and provider name are case-insensitive.
+    """
+
+    def __init__(self, document: Dict[str, Any]):
+        self.version: Optional[str] = document.get("version")
+        self.districts: List[Dict[str, Any]] = document.get("districts", []) or []
+        self.bus_providers: List[Dict[str, Any]] = document.get("bus_providers", []) or []
+        self.district_names: List[str] = [d["name"] for d in self.districts if d.get("name")]
+
+        self._districts: Dict[str, Dict[str, Any]] = {}
+        self._points: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for district in self.districts:
+            name = district.get("name")
+            if not name:
+                continue
+            self._districts[name.lower()] = district
+            self._points[name.lower()] = {
+                dp["name"].lower(): dp
+                for dp in district.get("dropping_points", []) or []
+                if dp.get("name")
+            }
+
+        self._providers: Dict[str, Dict[str, Any]] = {
+            p["name"].lower(): p for p in self.bus_providers if p.get("name")
+        }
+        self.coverage = CoverageIndex(self.district_names, self.bus_providers)
+
+    @property
+    def dataset(self) -> Dict[str, Any]:
+        return {"districts": self.districts, "bus_providers": self.bus_providers}
+
+    def district(self, name: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not name:
+            return None
+        return self._districts.get(name.strip().lower())
+
+    def dropping_points(self, district: Optional[str]) -> List[Dict[str, Any]]:
+        found = self.district(district)
+        return (found.get("dropping_points", []) or []) if found else []
+
+    def dropping_point(self, district: Optional[str], point: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not district or not point:
+            return None
+        return self._points.get(district.strip().lower(), {}).get(point.strip().lower())
+
+    def provider(self, name: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not name:
+            return None
+        return self._providers.get(name.strip().lower())
+
+
+_catalog: Optional[RouteCatalog] = None
+_checked_at = 0.0
+
+
+def get_catalog() -> Optional[RouteCatalog]:
+    """
+    Return the cached catalog, reloading it only when the stored version changes.
+
+    The version is checked at most once every ``REFRESH_SECONDS`` with a
+    projected read, so a normal turn never touches MongoDB for catalog data.
+    """
+    global _catalog, _checked_at
+
+    now = time.monotonic()
+    if _catalog is not None and now - _checked_at < REFRESH_SECONDS:
+        return _catalog
+    _checked_at = now
+
+    if _catalog is not None:
+        head = bus_collection.find_one({"_id": CATALOG_ID}, {"version": 1})
+        if head and head.get("version") == _catalog.version:
+            return _catalog
+
+    document = bus_collection.find_one(
+        {"_id": CATALOG_ID},
+        {"districts": 1, "bus_providers": 1, "version": 1},
+    )
+    _catalog = RouteCatalog(document) if document else None
+    return _catalog
+
+
+def invalidate_catalog():
+    """Drop the cached catalog so the next ``get_catalog`` call reloads it."""
+    global _catalog, _checked_at
+    _catalog = None
+    _checked_at = 0.0
@@ -0,0 +1,133 @@
+"""
+Seat inventory per trip (provider, route, travel date).
+
+Each trip is one ``trip_inventory`` document keyed ``provider|from|to|date``:
+
+    {"_id": ..., "capacity": 40, "available": 37, "sold": 2,
+     "holds": [{"hold_id": ..., "seats": 1, "expires_at": ...}]}
+
+Seats are held with a single conditional update
+(``available >= seats`` → ``$inc available -seats``, ``$push`` the hold), so
+concurrent bookings can never take more seats than exist. A hold either turns
+into a sale (``confirm_hold``) or expires after ``HOLD_SECONDS`` and is given
+back the next time the trip is touched.
+
+These functions are blocking pymongo calls; async nodes run them with
+``asyncio.to_thread``.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import trip_inventory_collection
+
+SEATS_PER_TRIP = int(os.getenv("SEATS_PER_TRIP", "40"))
+HOLD_SECONDS = int(os.getenv("SEAT_HOLD_SECONDS", "600"))
+
+
+def trip_key(provider: str, district_from: str, district_to: str, travel_date: str) -> str:
+    return "|".join(part.strip().lower() for part in (provider, district_from, district_to, travel_date))
+
+
+def _ensure_trip(key: str, capacity: int):
+    try:
+        trip_inventory_collection.update_one(
+            {"_id": key},
+            {"$setOnInsert": {"capacity": capacity, "available": capacity, "sold": 0, "holds": []}},
+            upsert=True,
+        )
+    except DuplicateKeyError:  # created by a concurrent request
+        pass
+
+
+def release_expired(key: str, now: Optional[datetime] = None) -> int:
+    """Give back the seats of expired holds on one trip; returns seats released."""
+    now = now or datetime.utcnow()
+    trip = trip_inventory_collection.find_one({"_id": key}, {"holds": 1})
+    released = 0
+    for hold in (trip or {}).get("holds", []):
+        if hold["expires_at"] > now:
+            continue
+        # Matching on the hold makes the release happen exactly once
+        result = trip_inventory_collection.update_one(
+            {"_id": key, "holds.hold_id": hold["hold_id"]},
+            {"$pull": {"holds": {"hold_id": hold["hold_id"]}}, "$inc": {"available": hold["seats"]}},
+        )
+        released += hold["seats"] * result.modified_count
+    return released
+
+
+def seats_available(key: str, capacity: int = SEATS_PER_TRIP) -> int:
+    release_expired(key)
+    trip = trip_inventory_collection.find_one({"_id": key}, {"available": 1})
+    return trip["available"] if trip else capacity
+
+
+def availability(capacities: Dict[str, int]) -> Dict[str, int]:
+    """
+    Seats left for each trip key in ``capacities`` (key -> capacity); trips
+    nobody booked yet have their full capacity.
+    """
+    for key in capacities:
+        release_expired(key)
+    found = {
+        trip["_id"]: trip["available"]
+        for trip in trip_inventory_collection.find({"_id": {"$in": list(capacities)}}, {"available": 1})
+    }
+    return {key: found.get(key, capacity) for key, capacity in capacities.items()}
+
+
+def hold_seats(key: str, seats: int, capacity: int = SEATS_PER_TRIP) -> Optional[Dict[str, Any]]:
+    """
+    Atomically hold ``seats`` on a trip. Returns the hold, or None when fewer
+    seats are left.
+    """
+    if seats <= 0:
+        return None
+    _ensure_trip(key, capacity)
+    release_expired(key)
+
+    hold = {
+        "hold_id": str(uuid.uuid4()),
+        "trip_id": key,
+        "seats": seats,
+        "expires_at": datetime.utcnow() + timedelta(seconds=HOLD_SECONDS),
+    }
+    result = trip_inventory_collection.update_one(
+        {"_id": key, "available": {"$gte": seats}},
+        {
+            "$inc": {"available": -seats},
+            "$push": {"holds": {k: hold[k] for k in ("hold_id", "seats", "expires_at")}},
+        },
+    )
+    return hold if result.modified_count else None
+
+
+def confirm_hold(hold: Dict[str, Any]) -> bool:
+    """Turn a live hold into sold seats. False if it already expired/was released."""
+    result = trip_inventory_collection.update_one(
+        {"_id": hold["trip_id"], "holds.hold_id": hold["hold_id"]},
+        {"$pull": {"holds": {"hold_id": hold["hold_id"]}}, "$inc": {"sold": hold["seats"]}},
+    )
+    return bool(result.modified_count)
+
+
+def release_hold(hold: Dict[str, Any]) -> bool:
+    """Give a hold's seats back before it expires (e.g. the booking changed)."""
+    result = trip_inventory_collection.update_one(
+        {"_id": hold["trip_id"], "holds.hold_id": hold["hold_id"]},
+        {"$pull": {"holds": {"hold_id": hold["hold_id"]}}, "$inc": {"available": hold["seats"]}},
+    )
+    return bool(result.modified_count)
+
+
+def release_seats(key: str, seats: int) -> bool:
+    """Return sold seats to the trip when a booking is cancelled."""
+    result = trip_inventory_collection.update_one(
+        {"_id": key, "sold": {"$gte": seats}},
+        {"$inc": {"available": seats, "sold": -seats}},
+    )
+    return bool(result.modified_count)
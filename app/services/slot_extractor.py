@@ -0,0 +1,208 @@
+"""
+Deterministic extraction of phone numbers, booking IDs, travel dates and seat
+counts from a single user message.
+
+Nodes consult this before asking the LLM; the LLM is only needed when nothing
+is found here.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+# Bangladeshi mobile numbers: 01XXXXXXXXX, 8801..., +8801..., 008801..., +88 01...
+_PHONE_RE = re.compile(
+    r"(?<![\d+])(?:(?:\+|00)?88[\s-]?)?(?:0[\s-]?)?1[3-9]\d{2}[\s-]?\d{3}[\s-]?\d{3}(?!\d)"
+)
+_PHONE_DIGITS_RE = re.compile(r"^(?:00)?(?:88)?0?(1[3-9]\d{8})$")
+
+_BOOKING_ID_RE = re.compile(
+    r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE
+)
+
+# Bangladesh has had no daylight saving since 2009, so a fixed offset is exact
+DHAKA_TZ = timezone(timedelta(hours=6), "Asia/Dhaka")
+
+_MONTH_NAMES = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+# Full names and the usual abbreviations only, so "2 separate" or "3 junior"
+# never read as a month
+_MONTHS = {name: number for number, name in enumerate(_MONTH_NAMES, 1)}
+_MONTHS.update({name[:3]: number for number, name in enumerate(_MONTH_NAMES, 1)})
+_MONTHS["sept"] = 9
+_MONTH = r"(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\b\.?"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s*(\d{4}))?"
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+_NUMBER_WORDS = {
+    "one": 1, "single": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+_SEATS_RE = re.compile(
+    r"\b(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")\s+(?:seats?|tickets?|persons?|people|passengers?)\b",
+    re.IGNORECASE,
+)
+MAX_SEATS = 20
+
+
+@dataclass
+class Slot:
+    name: str
+    value: Any
+    span: Tuple[int, int]
+    text: str
+
+
+def normalize_phone(raw: Optional[str]) -> Optional[str]:
+    """
+    Return the national form (01XXXXXXXXX) of a Bangladeshi mobile number,
+    or None if ``raw`` is not one.
+    """
+    if not raw:
+        return None
+    match = _PHONE_DIGITS_RE.match(re.sub(r"\D", "", str(raw)))
+    return f"0{match.group(1)}" if match else None
+
+
+def phone_e164(raw: Optional[str]) -> Optional[str]:
+    """Return the E.164 form (+8801XXXXXXXXX) used as the booking lookup key."""
+    national = normalize_phone(raw)
+    return f"+88{national}" if national else None
+
+
+def local_today() -> date:
+    """Today's date in Bangladesh, which relative dates ("tomorrow") refer to."""
+    return datetime.now(DHAKA_TZ).date()
+
+
+def _mask(text: str, span: Tuple[int, int]) -> str:
+    start, end = span
+    return text[:start] + " " * (end - start) + text[end:]
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _with_default_year(month: int, day: int, year: Optional[str], today: date) -> Optional[date]:
+    if year:
+        return _safe_date(int(year), month, day)
+    found = _safe_date(today.year, month, day)
+    if found and found < today:
+        found = _safe_date(today.year + 1, month, day)
+    return found
+
+
+def _find_date(text: str, today: date) -> Optional[Tuple[date, Tuple[int, int]]]:
+    lowered = text.lower()
+
+    match = re.search(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", lowered)
+    if match:
+        found = _safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        if found:
+            return found, match.span()
+
+    # Day first, as written in Bangladesh: 25/12/2025, 25-12-25, 25.12.2025.
+    # Dotted dates need the year, so decimals like "1.5 hours" are not dates.
+    match = re.search(
+        r"(?<![\d.])(\d{1,2})(?:([/-])(\d{1,2})(?:\2(\d{2,4}))?|\.(\d{1,2})\.(\d{2,4}))(?![\d.]*\d)", lowered
+    )
+    if match:
+        year = match.group(4) or match.group(6)
+        month = match.group(3) or match.group(5)
+        if year and len(year) == 2:
+            year = f"20{year}"
+        found = _with_default_year(int(month), int(match.group(1)), year, today)
+        if found:
+            return found, match.span()
+
+    match = re.search(rf"\b{_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR}", lowered)
+    if match:
+        found = _with_default_year(_MONTHS[match.group(2)], int(match.group(1)), match.group(3), today)
+        if found:
+            return found, match.span()
+
+    match = re.search(rf"\b{_MONTH}\s+{_DAY}\b{_YEAR}", lowered)
+    if match:
+        found = _with_default_year(_MONTHS[match.group(1)], int(match.group(2)), match.group(3), today)
+        if found:
+            return found, match.span()
+
+    match = re.search(r"\bday after tomorrow\b", lowered)
+    if match:
+        return today + timedelta(days=2), match.span()
+    match = re.search(r"\btomorrow\b", lowered)
+    if match:
+        return today + timedelta(days=1), match.span()
+    match = re.search(r"\b(today|tonight)\b", lowered)
+    if match:
+        return today, match.span()
+    match = re.search(r"\bin (\d{1,2}|" + "|".join(_NUMBER_WORDS) + r") days?\b", lowered)
+    if match:
+        amount = match.group(1)
+        days = int(amount) if amount.isdigit() else _NUMBER_WORDS[amount]
+        return today + timedelta(days=days), match.span()
+
+    match = re.search(r"\b(next|this|on|coming)?\s*(" + "|".join(_WEEKDAYS) + r")\b", lowered)
+    if match:
+        ahead = (_WEEKDAYS.index(match.group(2)) - today.weekday()) % 7
+        if match.group(1) == "next" and ahead == 0:
+            ahead = 7
+        start = match.start(1) if match.group(1) else match.start(2)
+        return today + timedelta(days=ahead), (start, match.end())
+
+    return None
+
+
+def extract_slots(text: str, today: Optional[date] = None) -> Dict[str, Slot]:
+    """
+    Extract the first phone, booking_id, date and seats mention from ``text``.
+
+    Values are normalized: phone as 01XXXXXXXXX, booking_id lower-case,
+    date as YYYY-MM-DD and seats as int. Matched spans are masked before
+    the next slot type is searched so a phone number never reads as a date.
+    """
+    today = today or local_today()
+    slots: Dict[str, Slot] = {}
+    remaining = text
+
+    match = _BOOKING_ID_RE.search(remaining)
+    if match:
+        slots["booking_id"] = Slot("booking_id", match.group(0).lower(), match.span(), match.group(0))
+        remaining = _mask(remaining, match.span())
+
+    for match in _PHONE_RE.finditer(remaining):
+        phone = normalize_phone(match.group(0))
+        if phone:
+            slots["phone"] = Slot("phone", phone, match.span(), match.group(0))
+            remaining = _mask(remaining, match.span())
+            break
+
+    match = _SEATS_RE.search(remaining)
+    if match:
+        amount = match.group(1).lower()
+        seats = int(amount) if amount.isdigit() else _NUMBER_WORDS[amount]
+        if 0 < seats <= MAX_SEATS:
+            slots["seats"] = Slot("seats", seats, match.span(), match.group(0))
+            remaining = _mask(remaining, match.span())
+
+    found = _find_date(remaining, today)
+    if found:
+        value, span = found
+        slots["date"] = Slot("date", value.isoformat(), span, text[span[0]:span[1]])
+
+    return slots
+
+
+def slot_values(slots: Dict[str, Slot]) -> Dict[str, Any]:
+    return {name: slot.value for name, slot in slots.items()}
+
+
+__all__ = ["DHAKA_TZ", "Slot", "extract_slots", "local_today", "normalize_phone", "phone_e164", "slot_values"]
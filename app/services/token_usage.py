@@ -0,0 +1,71 @@
+"""
+Per-turn LLM token accounting.
+
+The chat routes call ``start_turn()`` and print ``format_turn_report()``
+when the turn is over. LLM helpers call ``record_usage(label, usage)`` with
+the ``usage`` object of each completion. ``usage_totals()`` keeps the
+running totals per label, including how many prompt tokens the provider
+served from its prompt cache (``cached_tokens``); ``/llm/stats`` shows them
+with the overall ``cache_hit_rate()``.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+_turn: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("turn_token_usage", default=None)
+_totals: Dict[str, Dict[str, int]] = {}
+
+
+def start_turn():
+    # Nodes run in tasks that copy this context, so they append to the same list
+    _turn.set([])
+
+
+def record_usage(label: str, usage: Any):
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    entry = {
+        "label": label,
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+    turn = _turn.get()
+    if turn is not None:
+        turn.append(entry)
+
+    totals = _totals.setdefault(
+        label, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    )
+    totals["calls"] += 1
+    for key in ("prompt_tokens", "cached_tokens", "completion_tokens"):
+        totals[key] += entry[key]
+
+
+def turn_usage() -> List[Dict[str, Any]]:
+    return list(_turn.get() or [])
+
+
+def format_turn_report() -> Optional[str]:
+    """One line: each call's prompt(cached)+completion tokens and the turn total."""
+    calls = turn_usage()
+    if not calls:
+        return None
+    parts = [
+        f"{c['label']} {c['prompt_tokens']}({c['cached_tokens']} cached)+{c['completion_tokens']}"
+        for c in calls
+    ]
+    total = sum(c["prompt_tokens"] + c["completion_tokens"] for c in calls)
+    cached = sum(c["cached_tokens"] for c in calls)
+    return f"{', '.join(parts)} = {total} tokens, {cached} cached"
+
+
+def cache_hit_rate() -> float:
+    """Share of all prompt tokens served from the provider's prompt cache."""
+    prompt = sum(t["prompt_tokens"] for t in _totals.values())
+    cached = sum(t["cached_tokens"] for t in _totals.values())
+    return cached / prompt if prompt else 0.0
+
+
+def usage_totals() -> Dict[str, Dict[str, int]]:
+    return {label: dict(values) for label, values in _totals.items()}
@@ -0,0 +1,212 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+# "local" keeps vectors on disk next to the app; "pinecone" uses the hosted index.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "local").lower()
+LOCAL_VECTOR_PATH = os.getenv("LOCAL_VECTOR_PATH", ".vector_store")
+
+
+class VectorStore(ABC):
+    """
+    Minimal retrieval backend interface.
+
+    Vectors are dicts of ``{"id", "values", "metadata"}``; query results are
+    dicts of ``{"id", "score", "metadata"}`` sorted by descending score.
+    """
+
+    @abstractmethod
+    def query(self, vector: List[float], top_k: int = 1) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    def list_ids(self) -> Set[str]:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: Iterable[str]):
+        ...
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Brute-force cosine search over a float32 matrix of normalized embeddings.
+
+    The matrix is persisted as ``vectors.npy`` and memory-mapped on load;
+    ids and metadata live alongside it in ``records.json``.
+    """
+
+    def __init__(self, path: str = LOCAL_VECTOR_PATH):
+        self.path = path
+        self._vectors_file = os.path.join(path, "vectors.npy")
+        self._records_file = os.path.join(path, "records.json")
+        self._matrix: Optional[np.ndarray] = None
+        self._records: List[Dict[str, Any]] = []
+        self._loaded_mtime: Optional[int] = None
+        self._load()
+
+    def _mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self._records_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        self._loaded_mtime = self._mtime()
+        if self._loaded_mtime is None or not os.path.exists(self._vectors_file):
+            self._matrix, self._records = None, []
+            return
+        with open(self._records_file, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        if not records:
+            self._matrix, self._records = None, []
+            return
+        matrix = np.load(self._vectors_file, mmap_mode="r")
+        if matrix.shape[0] != len(records):
+            # Caught between the two renames of a save; keep the old state and retry
+            self._loaded_mtime = None
+            return
+        self._matrix, self._records = matrix, records
+
+    def _reload_if_changed(self):
+        # Another worker (or an ingestion run) may have rewritten the store
+        if self._mtime() != self._loaded_mtime:
+            self._load()
+
+    def _save(self, matrix: Optional[np.ndarray], records: List[Dict[str, Any]]):
+        os.makedirs(self.path, exist_ok=True)
+        if matrix is None or not records:
+            matrix, records = np.zeros((0, 0), dtype=np.float32), []
+
+        # Write to temp files (per process, so concurrent writers don't share
+        # one) and swap each in with os.replace, so readers never open a
+        # half-written file. records.json goes last: readers watch its mtime.
+        suffix = f".{os.getpid()}.tmp"
+        tmp_vectors = self._vectors_file + suffix
+        tmp_records = self._records_file + suffix
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, matrix.astype(np.float32, copy=False))
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        os.replace(tmp_vectors, self._vectors_file)
+        os.replace(tmp_records, self._records_file)
+        self._load()
+
+    def query(self, vector: List[float], top_k: int = 1) -> List[Dict[str, Any]]:
+        self._reload_if_changed()
+        if self._matrix is None or not self._records:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return []
+        scores = self._matrix @ (query / norm)
+
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {
+                "id": self._records[i]["id"],
+                "score": float(scores[i]),
+                "metadata": self._records[i].get("metadata", {}),
+            }
+            for i in best
+        ]
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        if not vectors:
+            return
+        self._reload_if_changed()
+        rows = {r["id"]: i for i, r in enumerate(self._records)}
+        matrix = np.array(self._matrix) if self._matrix is not None else None
+        records = list(self._records)
+
+        stored = len(records)
+        new_rows = []
+        for vec in vectors:
+            values = np.asarray(vec["values"], dtype=np.float32)
+            norm = np.linalg.norm(values)
+            values = values / norm if norm else values
+            record = {"id": vec["id"], "metadata": vec.get("metadata", {})}
+            row = rows.get(vec["id"])
+            if row is not None:
+                if row < stored:
+                    matrix[row] = values
+                else:
+                    new_rows[row - stored] = values
+                records[row] = record
+            else:
+                rows[vec["id"]] = len(records)
+                records.append(record)
+                new_rows.append(values)
+
+        if new_rows:
+            added = np.stack(new_rows)
+            matrix = added if matrix is None else np.vstack([matrix, added])
+        self._save(matrix, records)
+
+    def list_ids(self) -> Set[str]:
+        self._reload_if_changed()
+        return {r["id"] for r in self._records}
+
+    def delete(self, ids: Iterable[str]):
+        self._reload_if_changed()
+        drop = set(ids)
+        keep = [i for i, r in enumerate(self._records) if r["id"] not in drop]
+        if len(keep) == len(self._records):
+            return
+        matrix = np.array(self._matrix[keep]) if keep else None
+        self._save(matrix, [self._records[i] for i in keep])
+
+
+class PineconeVectorStore(VectorStore):
+    """Adapter over the hosted Pinecone index (optional dependency)."""
+
+    def __init__(self):
+        from app.services.load_to_pinecone import get_index
+
+        self.index = get_index()
+
+    def query(self, vector: List[float], top_k: int = 1) -> List[Dict[str, Any]]:
+        results = self.index.query(vector=vector, top_k=top_k, include_metadata=True)
+        return [
+            {"id": m["id"], "score": m["score"], "metadata": m.get("metadata") or {}}
+            for m in results["matches"]
+        ]
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        self.index.upsert(vectors)
+
+    def list_ids(self) -> Set[str]:
+        # Paginated id listing (serverless indexes)
+        return {vid for page in self.index.list() for vid in page}
+
+    def delete(self, ids: Iterable[str]):
+        ids = list(ids)
+        BATCH = 1000
+        for i in range(0, len(ids), BATCH):
+            self.index.delete(ids=ids[i:i + BATCH])
+
+
+_store: Optional[VectorStore] = None
+
+
+def get_vector_store() -> VectorStore:
+    """Return the process-wide store selected by ``VECTOR_BACKEND``."""
+    global _store
+    if _store is None:
+        if VECTOR_BACKEND == "pinecone":
+            _store = PineconeVectorStore()
+        elif VECTOR_BACKEND == "local":
+            _store = LocalVectorStore()
+        else:
+            raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
+    return _store
@@ -0,0 +1,21 @@
+from typing import Any, Dict, Optional
+from pymongo import ASCENDING, DESCENDING
+from app.config import booking_collection
+from app.services.slot_extractor import phone_e164
+
+
+def ensure_booking_indexes():
+    # Ticket lookups are exact matches on the normalized phone, newest first
+    booking_collection.create_index([("phone_e164", ASCENDING), ("booked_at", DESCENDING)])
+    booking_collection.create_index([("booking_id", ASCENDING)])
+
+
+def phone_query(phone: str) -> Optional[Dict[str, Any]]:
+    """
+    Exact, indexed filter for bookings made with ``phone``.
+
+    Returns None for numbers that aren't Bangladeshi mobiles: every booking
+    is made with a normalized number, so the caller should ask again.
+    """
+    e164 = phone_e164(phone)
+    return {"phone_e164": e164} if e164 else None
@@ -1,26 +1,76 @@
-from typing import Optional
-from app.config import chat_collection
-from datetime import datetime
-import uuid
-
-
-def create_or_get_thread(user_id: str, thread_id: Optional[str] = None):
-    if thread_id:
-        thread = chat_collection.find_one({"thread_id": thread_id})
-        if thread:
-            return thread_id
-    # Create new thread
-    new_thread_id = str(uuid.uuid4())
-    chat_collection.insert_one({
-        "thread_id": new_thread_id,
-        "user_id": user_id,
-        "chat": [],
-        "created_at": datetime.utcnow()
-    })
-    return new_thread_id
-
-def store_message(thread_id: str, user_message: str, bot_response: str):
+from typing import Any, Dict, Iterator, List, Optional
+from pymongo import ASCENDING
+from app.config import chat_collection, chat_bucket_collection
+
+# Messages are archived into fixed-size buckets; the thread document only keeps
+# a bounded tail, so reading the last N turns costs the same at any thread age.
+BUCKET_SIZE = 50
+TAIL_SIZE = 20  # messages that always stay on the thread document after archiving
+
+
+def ensure_indexes():
+    chat_collection.create_index([("thread_id", ASCENDING)])
+    chat_bucket_collection.create_index(
+        [("thread_id", ASCENDING), ("bucket", ASCENDING)], unique=True
+    )
+
+
+def history_projection(limit: int, *fields: str) -> Dict[str, Any]:
+    """Projection returning the last ``limit`` messages plus ``fields``."""
+    projection: Dict[str, Any] = {
+        "thread_id": 1,  # keeps this an inclusion projection (only the listed fields)
+        "recent": {"$slice": -limit},
+        "chat": {"$slice": -limit},  # threads created before bucketing
+    }
+    projection.update({field: 1 for field in fields})
+    return projection
+
+
+def recent_messages(thread: Optional[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    if not thread:
+        return []
+    return ((thread.get("chat") or []) + (thread.get("recent") or []))[-limit:]
+
+
+def archive_bucket(thread_id: str, message_count: int, archived_count: int):
+    """Move the oldest BUCKET_SIZE tail messages into their bucket document."""
+    tail = message_count - archived_count
+    if tail < BUCKET_SIZE + TAIL_SIZE:
+        return
+
+    thread = chat_collection.find_one({"thread_id": thread_id}, {"recent": {"$slice": BUCKET_SIZE}})
+    messages = (thread or {}).get("recent") or []
+    if len(messages) < BUCKET_SIZE:
+        return
+
+    bucket = archived_count // BUCKET_SIZE
+    chat_bucket_collection.replace_one(
+        {"thread_id": thread_id, "bucket": bucket},
+        {
+            "thread_id": thread_id,
+            "bucket": bucket,
+            "start_seq": archived_count,
+            "messages": messages,
+        },
+        upsert=True,
+    )
+    # Guarded on both counters: if another turn was appended meanwhile, skip and
+    # let the next append retry (the bucket write above is idempotent).
     chat_collection.update_one(
-        {"thread_id": thread_id},
-        {"$push": {"chat": {"user": user_message, "bot": bot_response, "timestamp": datetime.utcnow()}}}
+        {"thread_id": thread_id, "message_count": message_count, "archived_count": archived_count},
+        {
+            "$push": {"recent": {"$each": [], "$slice": -(tail - BUCKET_SIZE)}},
+            "$inc": {"archived_count": BUCKET_SIZE},
+        },
     )
+
+
+def iter_transcript(thread_id: str) -> Iterator[Dict[str, Any]]:
+    """Yield every message of a thread, oldest first (buckets, then the tail)."""
+    thread = chat_collection.find_one({"thread_id": thread_id}, {"chat": 1, "recent": 1})
+    if not thread:
+        return
+    yield from thread.get("chat") or []
+    for bucket in chat_bucket_collection.find({"thread_id": thread_id}).sort("bucket", ASCENDING):
+        yield from bucket.get("messages", [])
+    yield from thread.get("recent") or []
@@ -0,0 +1,250 @@
+"""
+Write-behind persistence for chat transcripts.
+
+With ``TRANSCRIPT_WRITE_BEHIND=1``, ``TurnContext.flush`` queues its
+message appends here instead of writing them on the request path. A
+background thread sends them to Mongo as one ordered ``bulk_write`` when
+``TRANSCRIPT_BATCH_SIZE`` appends are queued or ``TRANSCRIPT_FLUSH_INTERVAL``
+seconds have passed. The rest of the queue is written on shutdown.
+
+Durability:
+- A failed batch is retried with backoff. Messages that are already stored
+  (matched by their ``id``, in the thread tail or an archive bucket) are
+  skipped, so a retry never appends twice.
+- If Mongo is still down after the retries, the batch is appended to a local
+  spill file, ``TRANSCRIPT_SPILL_PATH`` suffixed with the process id so
+  workers never read or delete each other's. The file is replayed before any
+  newer batch, so each thread keeps its order. At start, spill files left by
+  processes that are no longer running are claimed (atomic rename) and
+  replayed.
+- Queued messages are visible to ``TurnContext.load`` in this process
+  (``pending_messages``), so the next turn sees them before they are flushed.
+"""
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from bson import json_util
+from pymongo import UpdateOne
+
+from app.config import chat_bucket_collection, chat_collection
+
+WRITE_BEHIND_ENABLED = os.getenv("TRANSCRIPT_WRITE_BEHIND", "0") == "1"
+BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", "200"))
+FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", "0.5"))
+SPILL_PATH = os.getenv("TRANSCRIPT_SPILL_PATH", ".transcript_spill.jsonl")
+MAX_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+
+def _running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by another user
+        return True
+    return True
+
+
+class TranscriptWriter:
+    def __init__(
+        self,
+        collection=chat_collection,
+        bucket_collection=chat_bucket_collection,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        spill_path: str = SPILL_PATH,
+    ):
+        self.collection = collection
+        self.bucket_collection = bucket_collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._adopted: List[str] = []
+        self.stats = {"batches": 0, "written": 0, "retries": 0, "spilled": 0}
+
+    # ---- request path -------------------------------------------------
+
+    def submit(self, thread_id: str, message: Dict[str, Any], set_on_insert: Dict[str, Any]):
+        """Queue one message append; returns immediately."""
+        with self._lock:
+            self._pending.setdefault(thread_id, []).append(message)
+        self._queue.put({"thread_id": thread_id, "message": message, "set_on_insert": set_on_insert})
+
+    def pending_messages(self, thread_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._pending.get(thread_id, []))
+
+    # ---- lifecycle ----------------------------------------------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued, then stop the thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    # ---- background thread -------------------------------------------
+
+    def _run(self):
+        self._adopt_orphans()
+        self._replay_spill()
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif self._stop.is_set():
+                return
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        if self._stop.is_set():
+            # Shutting down: take everything that's left
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        # Older spilled appends go first so each thread stays in order
+        if self._has_spill() and not self._replay_spill():
+            self._spill(batch)
+            return
+        if self._bulk_write(batch):
+            self._done(batch)
+        else:
+            self._spill(batch)
+
+    def _bulk_write(self, batch: List[Dict[str, Any]], check_stored: bool = False) -> bool:
+        delay = 0.5
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                if attempt or check_stored:
+                    # A failed attempt may have applied part of the batch
+                    batch = [op for op in batch if not self._is_stored(op)]
+                if batch:
+                    self.collection.bulk_write([self._to_update(op) for op in batch], ordered=True)
+                self.stats["batches"] += 1
+                self.stats["written"] += len(batch)
+                return True
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    logger.error("Transcript write failed after %d attempts: %s", attempt + 1, e)
+                    return False
+                self.stats["retries"] += 1
+                time.sleep(delay)
+                delay *= 2
+        return False
+
+    @staticmethod
+    def _to_update(op: Dict[str, Any]) -> UpdateOne:
+        return UpdateOne(
+            {"thread_id": op["thread_id"]},
+            {
+                "$setOnInsert": op["set_on_insert"],
+                "$push": {"recent": op["message"]},
+                "$inc": {"message_count": 1},
+            },
+            upsert=True,
+        )
+
+    def _is_stored(self, op: Dict[str, Any]) -> bool:
+        # The message may already have been rolled out of the tail into a bucket
+        message_id = op["message"]["id"]
+        if self.collection.find_one({"thread_id": op["thread_id"], "recent.id": message_id}, {"_id": 1}):
+            return True
+        return self.bucket_collection.find_one(
+            {"thread_id": op["thread_id"], "messages.id": message_id}, {"_id": 1}
+        ) is not None
+
+    def _done(self, batch: List[Dict[str, Any]]):
+        with self._lock:
+            for op in batch:
+                pending = self._pending.get(op["thread_id"])
+                if pending:
+                    pending[:] = [m for m in pending if m["id"] != op["message"]["id"]]
+                    if not pending:
+                        del self._pending[op["thread_id"]]
+
+    # ---- spill files -------------------------------------------------
+
+    def _own_spill(self) -> str:
+        return f"{self.spill_path}.{os.getpid()}"
+
+    def _has_spill(self) -> bool:
+        return bool(self._adopted) or os.path.exists(self._own_spill())
+
+    def _spill(self, batch: List[Dict[str, Any]]):
+        path = self._own_spill()
+        with open(path, "a", encoding="utf-8") as f:
+            for op in batch:
+                f.write(json_util.dumps(op) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats["spilled"] += len(batch)
+        logger.warning("Spilled %d transcript writes to %s", len(batch), path)
+
+    def _adopt_orphans(self):
+        """Claim spill files of processes that are gone (and an unsuffixed one)."""
+        own = self._own_spill()
+        for path in sorted(glob.glob(f"{glob.escape(self.spill_path)}.*")) + [self.spill_path]:
+            owner = path[len(self.spill_path) + 1:].split("-")[0]
+            if path == own or path.startswith(f"{own}-") or (owner and (not owner.isdigit() or _running(int(owner)))):
+                continue
+            claimed = f"{own}-{time.time_ns()}"
+            try:
+                os.replace(path, claimed)  # atomic: only one worker gets each file
+            except FileNotFoundError:
+                continue
+            self._adopted.append(claimed)
+
+    def _replay_spill(self) -> bool:
+        """Write spilled appends to Mongo, oldest file first; True when none are left."""
+        for path in self._adopted + [self._own_spill()]:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                ops = [json_util.loads(line) for line in f if line.strip()]
+            # The spilled batch may have been partly applied before it failed
+            if ops and not self._bulk_write(ops, check_stored=True):
+                return False
+            # Only this thread appends to these files, so nothing is lost here
+            os.remove(path)
+            if path in self._adopted:
+                self._adopted.remove(path)
+            self._done(ops)
+            if ops:
+                logger.info("Replayed %d spilled transcript writes from %s", len(ops), path)
+        return True
+
+
+transcript_writer = TranscriptWriter()
@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+import uuid
+
+from app.config import chat_collection
+from app.utils.chat_memory import (
+    BUCKET_SIZE,
+    TAIL_SIZE,
+    archive_bucket,
+    history_projection,
+    recent_messages,
+)
+from app.utils.transcript_writer import WRITE_BEHIND_ENABLED, transcript_writer
+
+# Most history any node looks at (book_ticket uses 15 turns).
+HISTORY_LIMIT = 15
+
+# Per-thread dialog state kept on the thread document.
+DIALOG_FIELDS = ("booking_data", "cancel_data", "view_ticket_phone")
+
+
+class TurnContext:
+    """
+    Everything a chat turn needs from ``chat_memory``, loaded with one read.
+
+    Nodes read history and dialog state from here and record their changes
+    with ``set``/``unset``; the route appends the exchange with
+    ``record_message`` and ``flush`` writes it all in a single update.
+    """
+
+    def __init__(self, thread_id: str, user_id: str, thread: Optional[Dict[str, Any]] = None):
+        thread = thread or {}
+        self.thread_id = thread_id
+        self.user_id = user_id
+        self.is_new = not thread
+        self.history: List[Dict[str, Any]] = recent_messages(thread, HISTORY_LIMIT)
+        self.message_count: int = thread.get("message_count", 0)
+        self.archived_count: int = thread.get("archived_count", 0)
+
+        self._state: Dict[str, Any] = {field: thread.get(field) for field in DIALOG_FIELDS}
+        self._set: Dict[str, Any] = {}
+        self._unset: Set[str] = set()
+        self._message: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def load(cls, user_id: str, thread_id: Optional[str] = None) -> "TurnContext":
+        """Load the thread (or start a new one if it doesn't exist)."""
+        if thread_id:
+            thread = chat_collection.find_one(
+                {"thread_id": thread_id},
+                history_projection(HISTORY_LIMIT, *DIALOG_FIELDS, "message_count", "archived_count"),
+            )
+            pending = transcript_writer.pending_messages(thread_id) if WRITE_BEHIND_ENABLED else []
+            if thread or pending:
+                context = cls(thread_id, user_id, thread)
+                # Appends still queued in the write-behind writer
+                if pending:
+                    context.is_new = False
+                    context.history = (context.history + pending)[-HISTORY_LIMIT:]
+                    context.message_count += len(pending)
+                return context
+        return cls(str(uuid.uuid4()), user_id)
+
+    def history_for(self, limit: int) -> List[Dict[str, Any]]:
+        return self.history[-limit:]
+
+    def get(self, field: str, default: Any = None) -> Any:
+        value = self._state.get(field)
+        return default if value is None else value
+
+    def set(self, field: str, value: Any):
+        self._state[field] = value
+        self._set[field] = value
+        self._unset.discard(field)
+
+    def unset(self, field: str):
+        self._state[field] = None
+        self._set.pop(field, None)
+        self._unset.add(field)
+
+    def record_message(self, user_message: str, bot_response: str):
+        self._message = {
+            "id": uuid.uuid4().hex,  # makes write-behind retries idempotent
+            "user": user_message,
+            "bot": bot_response,
+            "timestamp": datetime.utcnow(),
+        }
+
+    def _set_on_insert(self) -> Dict[str, Any]:
+        return {"user_id": self.user_id, "archived_count": 0, "created_at": datetime.utcnow()}
+
+    def build_update(self, include_message: bool = True) -> Dict[str, Any]:
+        update: Dict[str, Any] = {"$setOnInsert": self._set_on_insert()}
+        if self._set:
+            update["$set"] = dict(self._set)
+        if self._unset:
+            update["$unset"] = {field: "" for field in self._unset}
+        if self._message and include_message:
+            update["$push"] = {"recent": self._message}
+            update["$inc"] = {"message_count": 1}
+        return update
+
+    def flush(self):
+        """Write all changes of this turn with one upsert."""
+        if WRITE_BEHIND_ENABLED and self._message:
+            self._flush_write_behind()
+        else:
+            chat_collection.update_one({"thread_id": self.thread_id}, self.build_update(), upsert=True)
+
+        if self._message:
+            self.message_count += 1
+            # Rare second write: roll a full bucket out of the tail. Only what
+            # is already in Mongo can be archived.
+            stored = self.message_count
+            if WRITE_BEHIND_ENABLED:
+                stored -= len(transcript_writer.pending_messages(self.thread_id))
+            if stored - self.archived_count >= BUCKET_SIZE + TAIL_SIZE:
+                archive_bucket(self.thread_id, stored, self.archived_count)
+
+        self._set.clear()
+        self._unset.clear()
+        self._message = None
+
+    def _flush_write_behind(self):
+        # Dialog state is read by the very next turn, so it is still written
+        # now; the transcript append goes to the background writer.
+        if self._set or self._unset:
+            chat_collection.update_one(
+                {"thread_id": self.thread_id}, self.build_update(include_message=False), upsert=True
+            )
+        transcript_writer.submit(self.thread_id, self._message, self._set_on_insert())
@@ -0,0 +1,103 @@
+"""
+Concurrency benchmark for the chat graph against a stubbed LLM.
+
+Runs the same batch of concurrent conversations through ``flow.ainvoke``
+twice:
+
+- ``blocking``: the stub sleeps with ``time.sleep`` inside the call, which is
+  what the old synchronous ``OpenAI`` client did to the event loop.
+- ``async``: the stub awaits ``asyncio.sleep``, like ``AsyncOpenAI`` does.
+
+Every conversation sends a distinct message and the intent fast path is
+off, so each turn makes two LLM calls (router + general_chat). The reply
+cache is cleared before each run, so the second run gets no cache hits.
+
+MongoDB must be reachable at ``MONGO_URI`` (the route catalog is read once).
+
+Usage:
+    python -m benchmarks.concurrency --conversations 200 --latency 0.3
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.services import intent_classifier, llm
+from app.services.chatbot_langgraph import flow
+from app.services.langgraph_nodes.general_chat import reply_cache
+from app.utils.turn_context import TurnContext
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+async def _stream(content: str):
+    for word in content.split(" "):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+
+class _StubCompletions:
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def create(self, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        prompt = "\n".join(m["content"] for m in kwargs["messages"])
+        if "INTENT RULES" in prompt:
+            return _completion("general_chat")
+        if kwargs.get("stream"):
+            return _stream("Hello! I can help you book bus tickets.")
+        return _completion("Hello! I can help you book bus tickets.")
+
+
+class StubClient:
+    def __init__(self, latency: float, blocking: bool):
+        self.chat = SimpleNamespace(completions=_StubCompletions(latency, blocking))
+
+
+async def _run_batch(conversations: int) -> float:
+    async def one(i: int):
+        context = TurnContext(f"bench-{i}", "bench")
+        message = f"tell me something about travelling by bus ({i})"
+        state = {"user_message": message, "thread_id": context.thread_id, "context": context}
+        return await flow.ainvoke(state)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(conversations)))
+    return time.perf_counter() - start
+
+
+def run(mode: str, conversations: int, latency: float) -> float:
+    stub = StubClient(latency, blocking=(mode == "blocking"))
+    # Every node calls the LLM through the gateway in app.services.llm
+    llm.client = stub
+    # No concurrency cap here: the benchmark measures the event loop, not the limiter
+    llm.gateway = llm.LLMGateway(max_concurrency=conversations)
+    # Measure LLM I/O, not the local shortcuts in front of it
+    intent_classifier.FAST_PATH_ENABLED = False
+    reply_cache.clear()
+    elapsed = asyncio.run(_run_batch(conversations))
+    print(
+        f"{mode:>8}: {conversations} conversations in {elapsed:.2f}s "
+        f"-> {conversations / elapsed:.1f} turns/s"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM latency per call (s)")
+    args = parser.parse_args()
+
+    before = run("blocking", args.conversations, args.latency)
+    after = run("async", args.conversations, args.latency)
+    print(f" speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
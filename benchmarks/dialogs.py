@@ -0,0 +1,54 @@
+"""
+Scripted conversations shared by the replay benchmark and the load generator.
+
+Each dialog is a list of ``(turn_type, message)`` pairs sent on one thread.
+The turn type is only a label for reporting; the graph still routes each
+message itself. ``provider_info`` is left out: after the first run its
+answers come from the provider answer cache, which would hide the cost of
+retrieval and generation.
+
+``{phone}`` in a message is filled in by ``with_phone`` with a number no
+other playthrough uses, so a dialog's replies never depend on tickets booked
+by earlier runs or by other virtual users. The cassette masks phone
+numbers, so one recording serves them all.
+"""
+import itertools
+from typing import Dict, List, Tuple
+
+Dialog = List[Tuple[str, str]]
+
+_numbers = itertools.count(1)
+
+DIALOGS: Dict[str, Dialog] = {
+    "greeting": [
+        ("general_chat", "hello"),
+        ("general_chat", "what can you do?"),
+    ],
+    "route_info": [
+        ("ask_for_info", "which buses go from Dhaka to Chattogram?"),
+        ("ask_for_info", "what are the dropping points and fares there?"),
+    ],
+    "booking": [
+        ("book_ticket", "I want to book a ticket from Dhaka to Chattogram"),
+        ("book_ticket", "pickup from Gabtoli, drop at Agrabad"),
+        ("book_ticket", "Desh Travel, tomorrow, 2 seats"),
+        ("book_ticket", "my name is Rahim Uddin, phone {phone}"),
+        ("book_ticket", "yes, confirm"),
+    ],
+    "view": [
+        ("view_ticket", "show my tickets, phone {phone}"),
+    ],
+    "cancel": [
+        ("cancel_ticket", "cancel my ticket for tomorrow, phone {phone}"),
+        ("cancel_ticket", "yes"),
+    ],
+}
+
+# Route question → booking → view → cancel on one thread
+DIALOGS["journey"] = DIALOGS["route_info"] + DIALOGS["booking"] + DIALOGS["view"] + DIALOGS["cancel"]
+
+
+def with_phone(dialog: Dialog) -> Dialog:
+    """The dialog with ``{phone}`` replaced by a fresh mobile number."""
+    phone = f"017{next(_numbers):08d}"
+    return [(turn_type, message.replace("{phone}", phone)) for turn_type, message in dialog]
@@ -0,0 +1,120 @@
+"""
+Offline, deterministic graph benchmark: LLM calls replayed from a cassette
+and MongoDB replaced by mongomock, so the numbers show the graph's own
+overhead (routing, state, context, persistence) with a fixed LLM latency.
+
+Record once against the real API and a real MongoDB:
+    LLM_CASSETTE_MODE=record python -m benchmarks.graph_replay --runs 1
+
+Then replay anywhere, with no network:
+    python -m benchmarks.graph_replay --runs 20 --latency 0.2-0.6
+
+Replay runs set ``LLM_CASSETTE_MODE=replay`` and ``MONGO_URI=mongomock://``
+unless they are already set. With mongomock, bookings, seat inventory and
+chat history are cleared before every run, so each run replays the same
+conversation as the recording (a sold-out trip would not). Dialogs come from ``benchmarks.dialogs``. The
+warm-up (route catalog and vector index embeddings) runs first, as in the
+server, so a recorded cassette also serves ``benchmarks.loadgen`` runs.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+
+def _configure(latency: str):
+    # Must run before app.config is imported
+    os.environ.setdefault("LLM_CASSETTE_MODE", "replay")
+    os.environ.setdefault("LLM_CASSETTE_LATENCY", latency)
+    if os.environ["LLM_CASSETTE_MODE"] == "replay":
+        os.environ.setdefault("MONGO_URI", "mongomock://")
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+
+async def _run_dialog(flow, TurnContext, name, dialog, run, timings):
+    from app.services.token_usage import start_turn
+    from benchmarks.dialogs import with_phone
+
+    thread_id = None
+    for turn_type, message in with_phone(dialog):
+        start = time.perf_counter()
+        # Load and flush per turn, like /chat, so later turns see their history
+        context = await asyncio.to_thread(TurnContext.load, f"replay-{name}-{run}", thread_id)
+        thread_id = context.thread_id
+        start_turn()
+        state = {"user_message": message, "thread_id": thread_id, "context": context}
+        out = await flow.ainvoke(state)
+        context.record_message(message, out["result"])
+        await asyncio.to_thread(context.flush)
+        timings[turn_type].append(time.perf_counter() - start)
+
+
+def _reset_db():
+    # Only ever the in-process stand-in, never a real database
+    if not os.environ.get("MONGO_URI", "").startswith("mongomock://"):
+        return
+    from app.config import (
+        booking_collection,
+        chat_bucket_collection,
+        chat_collection,
+        trip_inventory_collection,
+    )
+
+    for collection in (booking_collection, trip_inventory_collection, chat_collection, chat_bucket_collection):
+        collection.delete_many({})
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="times each dialog is played")
+    parser.add_argument("--latency", default="0", help="synthetic LLM latency, e.g. 0.3 or 0.2-0.6")
+    parser.add_argument("--dialogs", nargs="*", help="dialog names (default: all)")
+    args = parser.parse_args()
+
+    _configure(args.latency)
+
+    from app.services.buss_data_loader import load_startup_data
+    from app.services.cassette import CASSETTE_MODE, CassetteMiss
+    from app.services.chatbot_langgraph import flow
+    from app.services.load_to_pinecone import sync_embeddings
+    from app.utils.turn_context import TurnContext
+    from benchmarks.dialogs import DIALOGS
+
+    load_startup_data()
+    sync_embeddings()
+    names = args.dialogs or list(DIALOGS)
+    timings = defaultdict(list)
+
+    async def run_all():
+        for run in range(args.runs):
+            await asyncio.to_thread(_reset_db)
+            for name in names:
+                await _run_dialog(flow, TurnContext, name, DIALOGS[name], run, timings)
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(run_all())
+    except CassetteMiss as e:
+        sys.exit(f"cassette miss for request {e}: record it again with LLM_CASSETTE_MODE=record")
+    elapsed = time.perf_counter() - start
+
+    turns = sum(len(v) for v in timings.values())
+    print(f"{CASSETTE_MODE}: {turns} turns in {elapsed:.2f}s (LLM latency {args.latency}s)")
+    for turn_type, values in sorted(timings.items()):
+        print(
+            f"  {turn_type:>14}: n={len(values):<4} "
+            f"p50={statistics.median(values) * 1000:.1f}ms "
+            f"p95={_percentile(values, 95) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load generator for ``POST /chat``: many virtual users, each playing scripted
+dialogs (``benchmarks.dialogs``) on its own thread, against a running server.
+
+Each virtual user starts a new thread per dialog (the first turn is sent
+without a ``thread_id`` and the returned one is reused) and books, views and
+cancels with a phone number of its own in every dialog it plays. The report has
+throughput, p50/p95/p99 latency and the error rate per turn type.
+
+For a capacity baseline, record the dialogs once, then run the server with
+replayed LLM calls and a local MongoDB:
+    LLM_CASSETTE_MODE=record python -m benchmarks.graph_replay --runs 1
+    LLM_CASSETTE_MODE=replay LLM_CASSETTE_LATENCY=0.2-0.6 SEATS_PER_TRIP=100000 \
+        MONGO_URI=mongodb://localhost:27017 uvicorn app.main:app --workers 1
+    python -m benchmarks.loadgen --users 100 --iterations 3
+then repeat with more ``--workers`` and compare. All users book the same
+trip, hence the large ``SEATS_PER_TRIP``: a sold-out reply is not in the
+recording. ``MONGO_URI=mongomock://`` only works with ``--workers 1``, since
+each worker would get its own in-memory database. Only the recorded dialogs
+replay: any other message is a cassette miss and fails with a 500.
+
+Usage:
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --users 50 --dialogs journey
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.dialogs import DIALOGS, with_phone
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, turn_type: str, elapsed: float, ok: bool):
+        if ok:
+            self.latencies[turn_type].append(elapsed)
+        else:
+            self.errors[turn_type] += 1
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _virtual_user(http: httpx.AsyncClient, user: int, names: List[str], iterations: int, think: float, stats: Stats):
+    for _ in range(iterations):
+        for name in names:
+            thread_id = None
+            for turn_type, message in with_phone(DIALOGS[name]):
+                body = {"message": message, "user_id": f"load-{user}", "thread_id": thread_id}
+                start = time.perf_counter()
+                try:
+                    resp = await http.post("/chat", json=body)
+                    ok = resp.status_code == 200
+                    if ok:
+                        thread_id = resp.json()["thread_id"]
+                except httpx.HTTPError:
+                    ok = False
+                stats.add(turn_type, time.perf_counter() - start, ok)
+                if think:
+                    await asyncio.sleep(random.uniform(0, 2 * think))
+
+
+async def run(url: str, users: int, names: List[str], iterations: int, think: float, timeout: float, ramp: float) -> float:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as http:
+
+        async def start_user(user: int):
+            # Spread user start times over the ramp-up period
+            await asyncio.sleep(ramp * user / users)
+            await _virtual_user(http, user, names, iterations, think, stats)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(start_user(i) for i in range(users)))
+        elapsed = time.perf_counter() - start
+
+    report(stats, users, elapsed)
+    return elapsed
+
+
+def report(stats: Stats, users: int, elapsed: float):
+    turn_types = sorted(set(stats.latencies) | set(stats.errors))
+    ok = sum(len(v) for v in stats.latencies.values())
+    failed = sum(stats.errors.values())
+    total = ok + failed
+    print(
+        f"{users} users, {total} turns in {elapsed:.2f}s -> {ok / elapsed:.1f} turns/s, "
+        f"errors {failed} ({failed / total:.1%})" if total else "no turns sent"
+    )
+    print(f"{'turn type':>14} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for turn_type in turn_types:
+        values = stats.latencies.get(turn_type, [])
+        errors = stats.errors.get(turn_type, 0)
+        rate = errors / (len(values) + errors)
+        if values:
+            p50, p95, p99 = (f"{p * 1000:.0f}ms" for p in (statistics.median(values), _percentile(values, 95), _percentile(values, 99)))
+        else:
+            p50 = p95 = p99 = "-"
+        print(f"{turn_type:>14} {len(values):>6} {p50:>9} {p95:>9} {p99:>9} {rate:>7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--dialogs", nargs="*", default=["journey"], choices=list(DIALOGS))
+    parser.add_argument("--iterations", type=int, default=1, help="times each user plays the dialogs")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between turns (s)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.users, args.dialogs, args.iterations, args.think, args.timeout, args.ramp))
+
+
+if __name__ == "__main__":
+    main()
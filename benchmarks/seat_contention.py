@@ -0,0 +1,67 @@
+"""
+Seat contention benchmark: many clients book the same trip at once.
+
+Every client holds and then confirms ``--seats`` seats on one trip with
+``--capacity`` seats, the way ``book_ticket`` does at its confirm and
+complete steps. The run checks that sold seats never exceed capacity and
+reports throughput and hold latency.
+
+MongoDB must be reachable at ``MONGO_URI``; the benchmark trip is removed
+afterwards.
+
+Usage:
+    python -m benchmarks.seat_contention --clients 200 --capacity 40 --seats 1
+"""
+import argparse
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import trip_inventory_collection
+from app.services.seat_inventory import confirm_hold, hold_seats, trip_key
+
+
+def _book(key: str, seats: int, capacity: int):
+    start = time.perf_counter()
+    hold = hold_seats(key, seats, capacity)
+    held = time.perf_counter() - start
+    return bool(hold and confirm_hold(hold)), held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=40)
+    parser.add_argument("--seats", type=int, default=1, help="seats per booking")
+    parser.add_argument("--workers", type=int, default=50, help="concurrent threads")
+    args = parser.parse_args()
+
+    key = trip_key(f"bench-{uuid.uuid4().hex[:8]}", "Dhaka", "Sylhet", "2099-01-01")
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(lambda _: _book(key, args.seats, args.capacity), range(args.clients)))
+        elapsed = time.perf_counter() - start
+
+        trip = trip_inventory_collection.find_one({"_id": key})
+        booked = sum(1 for ok, _ in results if ok)
+        latencies = sorted(held for _, held in results)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+
+        print(f"clients: {args.clients}, capacity: {args.capacity}, seats per booking: {args.seats}")
+        print(f"bookings confirmed: {booked} ({booked * args.seats} seats), rejected: {args.clients - booked}")
+        print(f"trip: sold={trip['sold']} available={trip['available']} open holds={len(trip['holds'])}")
+        print(f"throughput: {args.clients / elapsed:.0f} attempts/s")
+        print(f"hold latency: p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
+
+        oversold = trip["sold"] > args.capacity or trip["available"] < 0
+        print("OVERSOLD!" if oversold else "no overselling")
+        if oversold:
+            raise SystemExit(1)
+    finally:
+        trip_inventory_collection.delete_one({"_id": key})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Startup benchmark: time from process launch to the first served request
+(/healthz) and to readiness (/readyz returning 200).
+
+Usage:
+    python -m benchmarks.startup_time --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def _wait_for(url: str, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} not ready in time")
+
+
+def run_once(port: int, timeout: float):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        deadline = start + timeout
+        first = _wait_for(f"http://127.0.0.1:{port}/healthz", deadline) - start
+        try:
+            ready = _wait_for(f"http://127.0.0.1:{port}/readyz", deadline) - start
+        except TimeoutError:
+            ready = float("nan")
+        return first, ready
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    firsts, readies = [], []
+    for i in range(args.runs):
+        first, ready = run_once(args.port, args.timeout)
+        firsts.append(first)
+        readies.append(ready)
+        print(f"run {i + 1}: first request {first:.2f}s, ready {ready:.2f}s")
+
+    print(f"median time-to-first-request: {statistics.median(firsts):.2f}s")
+    print(f"median time-to-ready:         {statistics.median(readies):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import json
 import streamlit as st
 import requests
 
 API_URL = "http://localhost:8000/chat"  # your FastAPI endpoint
+STREAM_URL = f"{API_URL}/stream"  # Server-Sent Events variant
+STREAMING = True  # render tokens as they arrive instead of waiting for the full reply
 st.set_page_config(page_title="Chat", page_icon="💬")
 
 # ======================================
@@ -15,6 +18,41 @@ if "messages" not in st.session_state:
 
 USER_ID = "himel"  # static for demo; replace with login if needed
 
+
+def iter_sse(res):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    for line in res.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+def stream_reply(payload, placeholder):
+    """Post to /chat/stream and render tokens into ``placeholder``."""
+    text = ""
+    with requests.post(STREAM_URL, json=payload, stream=True, timeout=(5, 60)) as res:
+        res.raise_for_status()
+        for event, data in iter_sse(res):
+            if event == "start":
+                st.session_state.thread_id = data.get("thread_id")
+            elif event == "token":
+                text += data.get("text", "")
+                placeholder.markdown(text + "▌")
+            elif event == "done":
+                text = data.get("response", text)
+            elif event == "error":
+                raise RuntimeError(data.get("detail"))
+    placeholder.markdown(text)
+    return text
+
 # ======================================
 # Chat History UI
 # ======================================
@@ -42,19 +80,29 @@ if user_input:
         "thread_id": st.session_state.thread_id
     }
 
-    try:
-        res = requests.post(API_URL, json=payload, timeout=30)
-        res.raise_for_status()
-        data = res.json()
+    if STREAMING:
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            try:
+                assistant_reply = stream_reply(payload, placeholder)
+            except Exception as e:
+                assistant_reply = f"Error contacting backend: {e}"
+                placeholder.write(assistant_reply)
+        st.session_state.messages.append({"role": "assistant", "text": assistant_reply})
+    else:
+        try:
+            res = requests.post(API_URL, json=payload, timeout=30)
+            res.raise_for_status()
+            data = res.json()
 
-        # Extract thread_id and response
-        st.session_state.thread_id = data.get("thread_id")
-        assistant_reply = data.get("response", "")
+            # Extract thread_id and response
+            st.session_state.thread_id = data.get("thread_id")
+            assistant_reply = data.get("response", "")
 
-    except Exception as e:
-        assistant_reply = f"Error contacting backend: {e}"
+        except Exception as e:
+            assistant_reply = f"Error contacting backend: {e}"
 
-    # Show reply
-    st.session_state.messages.append({"role": "assistant", "text": assistant_reply})
-    with st.chat_message("assistant"):
-        st.write(assistant_reply)
+        # Show reply
+        st.session_state.messages.append({"role": "assistant", "text": assistant_reply})
+        with st.chat_message("assistant"):
+            st.write(assistant_reply)